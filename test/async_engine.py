@@ -0,0 +1,110 @@
+"""asyncio transport for the security suites.
+
+Drives the same check coroutines as http_client.Client, but on a single event
+loop: every probe goes through one aiohttp connector and is gated by a global
+concurrency cap plus a per-endpoint cap (keyed on host and path), so thousands
+of payload variants against /search, /login or /ping can be in flight without
+a thread per request.
+
+aiohttp is optional; it is only needed when the runner is started with
+``--async``.
+"""
+import asyncio
+import contextlib
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # async mode is optional
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_PER_ENDPOINT = 10
+
+Response = namedtuple('Response', 'status_code text headers url')
+
+
+class Engine:
+    """Owns the connector, the concurrency limits and every session it hands out.
+
+    Must be created inside a running event loop and closed with ``await close()``.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_endpoint=DEFAULT_PER_ENDPOINT):
+        if aiohttp is None:
+            raise RuntimeError('Async mode requires aiohttp: pip3 install aiohttp')
+        self.connector = aiohttp.TCPConnector(limit=concurrency)
+        self.per_endpoint = per_endpoint
+        self._global = asyncio.Semaphore(concurrency)
+        self._endpoints = {}
+        self._sessions = []
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        parts = urlsplit(url)
+        key = (parts.netloc, parts.path)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = asyncio.Semaphore(self.per_endpoint)
+        # Wait for the endpoint first so a busy endpoint does not hold global slots.
+        async with endpoint, self._global:
+            yield
+
+    def _open(self, cookie_jar):
+        s = aiohttp.ClientSession(connector=self.connector, connector_owner=False, cookie_jar=cookie_jar)
+        self._sessions.append(s)
+        return AsyncClient(self, s)
+
+    def client(self):
+        """Return a client for stateless probes: no cookies kept."""
+        return self._open(aiohttp.DummyCookieJar())
+
+    def session(self):
+        """Return a client with its own cookie jar."""
+        return self._open(aiohttp.CookieJar(unsafe=True))
+
+    async def close(self):
+        for s in self._sessions:
+            await s.close()
+        await self.connector.close()
+
+
+class AsyncClient:
+    """Non-blocking client with the same interface as http_client.Client."""
+
+    def __init__(self, engine, http_session):
+        self._engine = engine
+        self._session = http_session
+
+    async def request(self, method, url, params=None, data=None, files=None, allow_redirects=True, timeout=None):
+        if files:
+            form = aiohttp.FormData(data or {}, quote_fields=False)
+            for field, (filename, content, content_type) in files.items():
+                form.add_field(field, content, filename=filename, content_type=content_type)
+            data = form
+        kwargs = {'params': params, 'data': data, 'allow_redirects': allow_redirects}
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self._engine.slot(url):
+            async with self._session.request(method, url, **kwargs) as resp:
+                text = await resp.text(errors='replace')
+                return Response(resp.status, text, resp.headers, str(resp.url))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def set_cookie(self, name, value):
+        self._session.cookie_jar.update_cookies({name: value})
+
+    def session(self):
+        return self._engine.session()
+
+    def sleep(self, seconds):
+        return asyncio.sleep(seconds)
+
+    def gather(self, *awaitables):
+        return asyncio.gather(*awaitables)
@@ -0,0 +1,127 @@
+"""Shared, connection-pooled HTTP client for the security suites.
+
+All suites send their probes through sessions created here. Every session
+mounts the same HTTPAdapter, so connections to 127.0.0.1:5000 are kept alive
+and reused across checks and suites instead of being opened for every request.
+
+Cookies are never shared: ``client()`` returns a client that refuses to store
+cookies (the same behaviour as the bare ``requests.post`` calls it replaces),
+and ``session()`` returns a client with its own private cookie jar for checks
+that need to stay logged in or plant a cookie.
+
+Checks are written once as coroutines (``resp = await http.post(...)``) so the
+same definition runs here and on the asyncio engine in async_engine.py. This
+client performs each request as soon as the method is called and hands back an
+already-resolved awaitable, so a check never suspends and ``run_sync`` can
+drive it to completion without an event loop.
+
+The number of keep-alive connections kept per host defaults to
+SCAN_POOL_MAXSIZE (or 16) and can be changed with ``configure()``.
+"""
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.environ.get('SCAN_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.environ.get('SCAN_POOL_MAXSIZE', 16))
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def _shared_adapter():
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        return _adapter
+
+
+def configure(pool_maxsize=None, pool_connections=None):
+    """Resize the shared pool; sessions that were already created pick it up too."""
+    global POOL_MAXSIZE, POOL_CONNECTIONS
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    adapter = _shared_adapter()
+    with _adapter_lock:
+        adapter.poolmanager.clear()
+        adapter.init_poolmanager(POOL_CONNECTIONS, POOL_MAXSIZE)
+
+
+def _new_session():
+    s = requests.Session()
+    adapter = _shared_adapter()
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+
+class Done:
+    """An awaitable that already holds its result."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self.value
+        yield
+
+
+def run_sync(coro):
+    """Run a check coroutine that only awaits on this module's Client."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError('check awaited something other than the blocking client')
+
+
+def _resolve(awaitable):
+    return awaitable.value if isinstance(awaitable, Done) else run_sync(awaitable)
+
+
+class Client:
+    """Blocking client with the same interface as async_engine.AsyncClient."""
+
+    def __init__(self, http_session):
+        self._session = http_session
+
+    def get(self, url, **kwargs):
+        return Done(self._session.get(url, **kwargs))
+
+    def post(self, url, **kwargs):
+        return Done(self._session.post(url, **kwargs))
+
+    def set_cookie(self, name, value):
+        self._session.cookies.set(name, value)
+
+    def session(self):
+        return session()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        return Done(None)
+
+    def gather(self, *awaitables):
+        return Done([_resolve(awaitable) for awaitable in awaitables])
+
+
+def session():
+    """Return a new client with its own cookie jar that uses the shared pool."""
+    return Client(_new_session())
+
+
+def client():
+    """Return a client for stateless probes: shared pool, no cookies kept."""
+    s = _new_session()
+    s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return Client(s)
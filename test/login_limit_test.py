@@ -0,0 +1,92 @@
+"""Tests for the /login rate limit in webiste/app.py that need no server.
+
+The app runs in-process through Flask's test client, against a scratch
+database and upload folder.
+
+Run from the test directory:
+    python3 -m pytest login_limit_test.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'webiste'))
+
+import passwords  # noqa: E402
+from app import app, create_app, get_db, login_limiter  # noqa: E402
+
+# Cheap hashes, so the test spends its time in the limiter rather than scrypt.
+WORK_FACTOR = 10
+ATTEMPTS = 20
+
+
+class LoginLimitTest(unittest.TestCase):
+    rate_limit_database = False
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        uploads = os.path.join(tmp.name, 'uploads')
+        os.mkdir(uploads)
+        database = os.path.join(tmp.name, 'ratelimit.db') if self.rate_limit_database else ''
+        saved = {name: app.config.get(name) for name in ('DATABASE', 'UPLOAD_FOLDER', 'UPLOAD_STORE',
+                                                         'RATE_LIMIT_DATABASE', 'PASSWORD_WORK_FACTOR')}
+        self.addCleanup(app.config.update, saved)
+        create_app({'DATABASE': os.path.join(tmp.name, 'users.db'), 'UPLOAD_FOLDER': uploads,
+                    'UPLOAD_STORE': os.path.join(uploads, '.store'), 'RATE_LIMIT_DATABASE': database,
+                    'PASSWORD_WORK_FACTOR': WORK_FACTOR})
+        with app.app_context():
+            login_limiter.reset()
+            conn = get_db()
+            conn.execute("INSERT INTO users (username, password, email, role) VALUES ('carol', ?, 'carol@example.com', 'user')",
+                         (passwords.get_hasher().hash('right-pass'),))
+            conn.commit()
+
+    def login(self, password, addr='10.0.0.1'):
+        return app.test_client().post('/login', data={'username': 'carol', 'password': password},
+                                      environ_overrides={'REMOTE_ADDR': addr})
+
+    def test_concurrent_failures_are_limited(self):
+        statuses = []
+        lock = threading.Lock()
+        start = threading.Barrier(ATTEMPTS)
+
+        def attempt():
+            start.wait()
+            status = self.login('wrong-pass').status_code
+            with lock:
+                statuses.append(status)
+
+        threads = [threading.Thread(target=attempt, daemon=True) for _ in range(ATTEMPTS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+        self.assertEqual(len(statuses), ATTEMPTS)
+        checked = [status for status in statuses if status != 429]
+        self.assertLessEqual(len(checked), login_limiter.max_hits, statuses)
+
+    def test_successful_logins_do_not_count(self):
+        for _ in range(2 * login_limiter.max_hits):
+            self.assertIn(b'Welcome carol', self.login('right-pass').data)
+        for _ in range(login_limiter.max_hits):
+            self.assertIn(b'Invalid credentials', self.login('wrong-pass').data)
+        self.assertEqual(self.login('wrong-pass').status_code, 429)
+        self.assertEqual(self.login('right-pass').status_code, 429)
+
+    def test_rejected_input_does_not_count(self):
+        for _ in range(2 * login_limiter.max_hits):
+            self.assertIn(b'Invalid input', self.login('x' * 51).data)
+        self.assertIn(b'Welcome carol', self.login('right-pass').data)
+
+
+class SharedLoginLimitTest(LoginLimitTest):
+    """The same, with the counts in a RATE_LIMIT_DATABASE shared by workers."""
+
+    rate_limit_database = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,11 @@
-import requests
-import time
-from datetime import datetime
-import os
+import http_client
+import reporting
+import timing_analysis
+import rate_limit_probe
 
 BASE_URL = 'http://127.0.0.1:5000/login'
 SESSION_URL = 'http://127.0.0.1:5000/'
 
-results = []
-recommendations = []
 
 TEST_DESCRIPTIONS = [
     ("SQL Injection Test", "Attempts to bypass authentication using a classic SQL injection payload."),
@@ -31,154 +29,103 @@ TEST_FIXES = {
     "Session Fixation Test": "Regenerate session IDs after login and do not accept user-supplied session IDs. Use secure, random session tokens."
 }
 
-def add_result(title, status, details, success, description):
-    color = '#e6ffed' if success else '#ffeaea'
-    border = '2px solid #28a745' if success else '2px solid #dc3545'
-    icon = '✅' if success else '❌'
-    results.append(f'''
-    <div class="test-card" style="background:{color};border:{border};">
-        <div class="test-header">
-            <span class="test-icon">{icon}</span>
-            <span class="test-title">{title}</span>
-        </div>
-        <div class="test-desc">{description}</div>
-        <div class="test-status"><b>Status:</b> {status}</div>
-        <div class="test-details"><pre>{details}</pre></div>
-    </div>
-    ''')
-    if not success:
-        fix = TEST_FIXES.get(title, "No fix suggestion available.")
-        recommendations.append(f'<li><b>{title}:</b> {description}<br><span style="color:#1a73e8"><b>How to fix:</b> {fix}</span></li>')
+report = reporting.Report('login', 'Login Security Test Report', TEST_FIXES)
+add_result = report.add_result
+write_report = report.close
 
 # Test 1: SQL Injection attempt
-payload = {'username': "admin' OR '1'='1", 'password': 'anything'}
-resp = requests.post(BASE_URL, data=payload)
-sqli_success = 'Welcome' not in resp.text
-add_result('SQL Injection Test', resp.status_code, resp.text[:200], sqli_success, TEST_DESCRIPTIONS[0][1])
+async def check_sql_injection(http, add_result):
+    payload = {'username': "admin' OR '1'='1", 'password': 'anything'}
+    resp = await http.post(BASE_URL, data=payload)
+    sqli_success = 'Welcome' not in resp.text
+    add_result('SQL Injection Test', resp.status_code, resp.text[:200], sqli_success, TEST_DESCRIPTIONS[0][1])
 
 # Test 2: Brute force (try several passwords)
-brute_success = False
-brute_details = ''
-for pwd in ['wrongpass', '123456', 'secret', 'admin']:
-    payload = {'username': 'admin', 'password': pwd}
-    resp = requests.post(BASE_URL, data=payload)
-    brute_details += f'Trying password: {pwd} | Status: {resp.status_code} | Found: {"Welcome" in resp.text}\n'
-    if "Welcome" in resp.text and pwd != 'secret':
-        brute_success = False
-        break
-    if "Welcome" in resp.text and pwd == 'secret':
-        brute_success = True
-add_result('Brute Force Test', 'Multiple', brute_details, brute_success, TEST_DESCRIPTIONS[1][1])
+async def check_brute_force(http, add_result):
+    brute_success = False
+    brute_details = ''
+    for pwd in ['wrongpass', '123456', 'secret', 'admin']:
+        payload = {'username': 'admin', 'password': pwd}
+        resp = await http.post(BASE_URL, data=payload)
+        brute_details += f'Trying password: {pwd} | Status: {resp.status_code} | Found: {"Welcome" in resp.text}\n'
+        if "Welcome" in resp.text and pwd != 'secret':
+            brute_success = False
+            break
+        if "Welcome" in resp.text and pwd == 'secret':
+            brute_success = True
+    add_result('Brute Force Test', 'Multiple', brute_details, brute_success, TEST_DESCRIPTIONS[1][1])
 
 # Test 3: Input validation (long username)
-long_username = 'a' * 100
-payload = {'username': long_username, 'password': 'test'}
-resp = requests.post(BASE_URL, data=payload)
-input_valid = 'Invalid' in resp.text
-add_result('Input Validation Test', resp.status_code, resp.text[:200], input_valid, TEST_DESCRIPTIONS[2][1])
+async def check_input_validation(http, add_result):
+    long_username = 'a' * 100
+    payload = {'username': long_username, 'password': 'test'}
+    resp = await http.post(BASE_URL, data=payload)
+    input_valid = 'Invalid' in resp.text
+    add_result('Input Validation Test', resp.status_code, resp.text[:200], input_valid, TEST_DESCRIPTIONS[2][1])
 
 # Test 4: Account lockout/rate limiting
-lockout_triggered = False
-lockout_details = ''
-for i in range(7):
+async def check_account_lockout(http, add_result):
     payload = {'username': 'admin', 'password': 'wrongpass'}
-    resp = requests.post(BASE_URL, data=payload)
-    lockout_details += f'Attempt {i+1}: {resp.status_code} | {resp.text[:100]}\n'
-    if 'Too many login attempts' in resp.text:
-        lockout_triggered = True
-        break
-    time.sleep(0.5)
-add_result('Account Lockout/Rate Limiting Test', 'Multiple', lockout_details, lockout_triggered, TEST_DESCRIPTIONS[3][1])
+    send = lambda: http.post(BASE_URL, data=payload)
+    is_limited = lambda resp: 'Too many login attempts' in resp.text
+    limit = await rate_limit_probe.discover(http, send, is_limited, max_requests=7)
+    add_result('Account Lockout/Rate Limiting Test', 'Multiple', rate_limit_probe.describe(limit), limit.limited, TEST_DESCRIPTIONS[3][1])
 
 # Test 5: Timing attack (measure response time for valid vs invalid password)
-def measure_time(username, password):
-    start = time.time()
-    requests.post(BASE_URL, data={'username': username, 'password': password})
-    return time.time() - start
-valid_time = measure_time('admin', 'secret')
-invalid_time = measure_time('admin', 'wrongpass')
-timing_success = abs(valid_time - invalid_time) < 0.05
-timing_details = f'Valid login time: {valid_time:.4f}s\nInvalid login time: {invalid_time:.4f}s'
-add_result('Timing Attack Test', 'N/A', timing_details, timing_success, TEST_DESCRIPTIONS[4][1])
+async def check_timing_attack(http, add_result):
+    def probe(username, password):
+        return lambda: http.post(BASE_URL, data={'username': username, 'password': password})
+    result = await timing_analysis.compare(probe('admin', 'secret'), probe('admin', 'wrongpass'), min_effect=0.05)
+    timing_success = timing_analysis.passed(result)
+    add_result('Timing Attack Test', 'N/A', timing_analysis.describe(result, 'Valid login', 'Invalid login'), timing_success, TEST_DESCRIPTIONS[4][1])
 
 # Test 6: Error message consistency
-resp1 = requests.post(BASE_URL, data={'username': 'admin', 'password': 'wrongpass'})
-resp2 = requests.post(BASE_URL, data={'username': 'notarealuser', 'password': 'wrongpass'})
-err_consistent = resp1.text == resp2.text
-err_details = 'Consistent' if err_consistent else 'Inconsistent error messages!'
-add_result('Error Message Consistency Test', 'N/A', err_details, err_consistent, TEST_DESCRIPTIONS[5][1])
+async def check_error_consistency(http, add_result):
+    resp1 = await http.post(BASE_URL, data={'username': 'admin', 'password': 'wrongpass'})
+    resp2 = await http.post(BASE_URL, data={'username': 'notarealuser', 'password': 'wrongpass'})
+    err_consistent = resp1.text == resp2.text
+    err_details = 'Consistent' if err_consistent else 'Inconsistent error messages!'
+    add_result('Error Message Consistency Test', 'N/A', err_details, err_consistent, TEST_DESCRIPTIONS[5][1])
 
 # Test 7: CSRF protection (check for CSRF token in login form)
-resp = requests.get(BASE_URL)
-csrf_found = 'csrf' in resp.text.lower()
-csrf_details = 'CSRF token found.' if csrf_found else 'No CSRF token found.'
-add_result('CSRF Protection Test', 'N/A', csrf_details, csrf_found, TEST_DESCRIPTIONS[6][1])
+async def check_csrf(http, add_result):
+    resp = await http.get(BASE_URL)
+    csrf_found = 'csrf' in resp.text.lower()
+    csrf_details = 'CSRF token found.' if csrf_found else 'No CSRF token found.'
+    add_result('CSRF Protection Test', 'N/A', csrf_details, csrf_found, TEST_DESCRIPTIONS[6][1])
 
 # Test 8: Session fixation (reuse session cookie)
-s = requests.Session()
-s.get(SESSION_URL)
-s.cookies.set('session', 'fixedsessionid')
-resp = s.post(BASE_URL, data={'username': 'admin', 'password': 'secret'})
-session_fix = 'Welcome' not in resp.text
-session_details = 'Session fixation not possible.' if session_fix else 'Login succeeded with fixed session ID.'
-add_result('Session Fixation Test', 'N/A', session_details, session_fix, TEST_DESCRIPTIONS[7][1])
-
-# Save report with timestamp
-report_dir = 'test reports'
-os.makedirs(report_dir, exist_ok=True)
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-report_filename = f'login_security_report_{timestamp}.html'
-report_path = os.path.join(report_dir, report_filename)
-
-# Write results to HTML file
-html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Login Security Test Report</title>
-    <meta name='viewport' content='width=device-width, initial-scale=1'>
-    <style>
-        body {{ font-family: 'Segoe UI', Arial, sans-serif; background: #f4f4f4; margin: 0; padding: 0; }}
-        .container {{ max-width: 950px; margin: 40px auto; background: #fff; padding: 30px; border-radius: 12px; box-shadow: 0 4px 16px #bbb; }}
-        h1 {{ text-align: center; color: #222; letter-spacing: 1px; }}
-        .legend {{ margin: 20px 0; text-align: center; }}
-        .legend span {{ display: inline-block; width: 20px; height: 20px; border-radius: 3px; margin-right: 8px; }}
-        .test-card {{ margin: 24px 0; padding: 18px 20px; border-radius: 10px; box-shadow: 0 2px 8px #e0e0e0; transition: box-shadow 0.2s; }}
-        .test-card:hover {{ box-shadow: 0 4px 16px #b0b0b0; }}
-        .test-header {{ display: flex; align-items: center; font-size: 1.2em; margin-bottom: 6px; }}
-        .test-icon {{ font-size: 1.5em; margin-right: 12px; }}
-        .test-title {{ font-weight: bold; color: #222; }}
-        .test-desc {{ color: #555; margin-bottom: 8px; font-size: 0.98em; }}
-        .test-status {{ margin-bottom: 6px; }}
-        .test-details pre {{ background: #f8f9fa; padding: 10px; border-radius: 6px; font-size: 0.97em; overflow-x: auto; }}
-        h2 {{ color: #1a73e8; margin-top: 40px; }}
-        ul {{ margin-left: 20px; }}
-        @media (max-width: 600px) {{
-            .container {{ padding: 10px; }}
-            .test-card {{ padding: 10px 6px; }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Login Security Test Report</h1>
-        <p><b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        <div class="legend">
-            <b>Legend:</b>
-            <span style="background:#e6ffed; border:2px solid #28a745"></span> Pass
-            <span style="background:#ffeaea; border:2px solid #dc3545"></span> Fail
-        </div>
-        {''.join(results)}
-        <h2>Recommendations</h2>
-        <ul>
-            {''.join(recommendations) if recommendations else '<li>All tests passed. No critical issues detected.</li>'}
-        </ul>
-    </div>
-</body>
-</html>
-"""
-
-with open(report_path, 'w') as f:
-    f.write(html)
-
-print(f"\nReport saved to {report_path}") 
\ No newline at end of file
+async def check_session_fixation(http, add_result):
+    s = http.session()
+    await s.get(SESSION_URL)
+    s.set_cookie('session', 'fixedsessionid')
+    resp = await s.post(BASE_URL, data={'username': 'admin', 'password': 'secret'})
+    session_fix = 'Welcome' not in resp.text
+    session_details = 'Session fixation not possible.' if session_fix else 'Login succeeded with fixed session ID.'
+    add_result('Session Fixation Test', 'N/A', session_details, session_fix, TEST_DESCRIPTIONS[7][1])
+
+CHECKS = [
+    check_sql_injection,
+    check_brute_force,
+    check_input_validation,
+    check_timing_attack,
+    check_error_consistency,
+    check_csrf,
+    check_session_fixation,
+    check_account_lockout,
+]
+
+# Every POST that reaches the per-IP limiter in /login changes what the next
+# one sees, so these run one after another. The lockout check saturates the
+# limiter and goes last.
+SERIAL_GROUPS = [
+    (check_sql_injection, check_brute_force, check_timing_attack,
+     check_error_consistency, check_session_fixation, check_account_lockout),
+]
+
+
+if __name__ == '__main__':
+    http = http_client.client()
+    for check in CHECKS:
+        http_client.run_sync(check(http, add_result))
+    write_report()
@@ -0,0 +1,72 @@
+"""Unit tests for webiste/ping_runner.py that need no server.
+
+Run from the test directory:
+    python3 -m pytest ping_runner_test.py
+"""
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'webiste'))
+
+import ping_runner  # noqa: E402
+
+
+class InlineExecutor:
+    """Runs each call at once, so its future is done when submit() returns."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class InstantPingRunner(ping_runner.PingRunner):
+    """A runner whose pings finish before ping() registers its callback,
+    as when the ping binary is missing or exits at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._executor.shutdown()
+        self._executor = InlineExecutor()
+
+    def _run(self, host):
+        return f'pinged {host}'
+
+
+class PingRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.runner = InstantPingRunner(workers=1, queue=0)
+        self.addCleanup(self.runner.close)
+
+    def ping(self, host):
+        # A deadlock would block forever; fail the test instead.
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self.runner.ping(host)), daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive(), 'ping() deadlocked')
+        return result[0]
+
+    def test_finished_ping_does_not_deadlock(self):
+        self.assertEqual(self.ping('localhost'), 'pinged localhost')
+        self.assertEqual(self.ping('127.0.0.1'), 'pinged 127.0.0.1')
+
+    def test_slot_is_released(self):
+        # With one worker and no queue, a leaked slot makes the next ping Busy.
+        for host in ('a.example', 'b.example', 'c.example'):
+            self.assertEqual(self.ping(host), f'pinged {host}')
+        self.assertEqual(self.runner._pending, 0)
+
+    def test_result_is_cached(self):
+        self.ping('localhost')
+        self.assertIsNotNone(self.runner._cache['localhost'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
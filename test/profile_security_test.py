@@ -1,13 +1,11 @@
-import requests
+import http_client
+import reporting
+import timing_analysis
 import time
-from datetime import datetime
-import os
 
 BASE_URL = 'http://127.0.0.1:5000/profile'
 LOGIN_URL = 'http://127.0.0.1:5000/login'
 REGISTER_URL = 'http://127.0.0.1:5000/register'
-results = []
-recommendations = []
 
 TESTS = [
     ("Authentication Required Test", "Check if /profile redirects to login when not authenticated."),
@@ -29,134 +27,85 @@ TEST_FIXES = {
     "Timing Attack Test": "Ensure response times are consistent regardless of input validity. Use constant-time comparison functions."
 }
 
-def add_result(title, status, details, success, description):
-    color = '#e6ffed' if success else '#ffeaea'
-    border = '2px solid #28a745' if success else '2px solid #dc3545'
-    icon = '✅' if success else '❌'
-    results.append(f'''
-    <div class="test-card" style="background:{color};border:{border};">
-        <div class="test-header">
-            <span class="test-icon">{icon}</span>
-            <span class="test-title">{title}</span>
-        </div>
-        <div class="test-desc">{description}</div>
-        <div class="test-status"><b>Status:</b> {status}</div>
-        <div class="test-details"><pre>{details}</pre></div>
-    </div>
-    ''')
-    if not success:
-        fix = TEST_FIXES.get(title, "No fix suggestion available.")
-        recommendations.append(f'<li><b>{title}:</b> {description}<br><span style="color:#1a73e8"><b>How to fix:</b> {fix}</span></li>')
+report = reporting.Report('profile', 'Profile Security Test Report', TEST_FIXES)
+add_result = report.add_result
+write_report = report.close
 
-# Helper: Register and login a test user
-session = requests.Session()
+session = None
 username = f"testuser_{int(time.time())}"
 password = "TestPass123!"
 email = f"{username}@example.com"
-# Register
-session.post(REGISTER_URL, data={"username": username, "email": email, "password": password, "confirm": password, "role": "user"})
-# Login
-session.post(LOGIN_URL, data={"username": username, "password": password})
+
+# Helper: Register and login a test user
+async def setup(http):
+    global session
+    session = http.session()
+    # Register
+    await session.post(REGISTER_URL, data={"username": username, "email": email, "password": password, "confirm": password, "role": "user"})
+    # Login
+    await session.post(LOGIN_URL, data={"username": username, "password": password})
 
 # 1. Authentication Required Test
-resp = requests.get(BASE_URL)
-auth_required = '/login' in resp.url or resp.status_code in (301, 302)
-add_result(TESTS[0][0], resp.status_code, 'Redirected to login.' if auth_required else 'Profile accessible without login!', auth_required, TESTS[0][1])
+async def check_auth_required(http, add_result):
+    resp = await http.get(BASE_URL)
+    auth_required = '/login' in resp.url or resp.status_code in (301, 302)
+    add_result(TESTS[0][0], resp.status_code, 'Redirected to login.' if auth_required else 'Profile accessible without login!', auth_required, TESTS[0][1])
 
 # 2. Input Validation Test
-resp = session.post(BASE_URL, data={"email": "notanemail"})
-input_valid = 'Invalid' in resp.text or resp.status_code == 400
-add_result(TESTS[1][0], resp.status_code, 'Invalid email rejected.' if input_valid else 'Invalid email accepted!', input_valid, TESTS[1][1])
+async def check_input_validation(http, add_result):
+    resp = await session.post(BASE_URL, data={"email": "notanemail"})
+    input_valid = 'Invalid' in resp.text or resp.status_code == 400
+    add_result(TESTS[1][0], resp.status_code, 'Invalid email rejected.' if input_valid else 'Invalid email accepted!', input_valid, TESTS[1][1])
 
 # 3. Privilege Escalation Test
-# Try to edit another user's profile (should not be possible, but we simulate by direct POST if possible)
-# This test is limited by the app's design; we check if the session user can only edit their own profile.
-# (No direct user_id param, so this is a logic check.)
-priv_success = True  # Assume pass if no user_id param
-add_result(TESTS[2][0], 200, 'No user_id param, so privilege escalation not possible.', priv_success, TESTS[2][1])
+async def check_privilege_escalation(http, add_result):
+    # Try to edit another user's profile (should not be possible, but we simulate by direct POST if possible)
+    # This test is limited by the app's design; we check if the session user can only edit their own profile.
+    # (No direct user_id param, so this is a logic check.)
+    priv_success = True  # Assume pass if no user_id param
+    add_result(TESTS[2][0], 200, 'No user_id param, so privilege escalation not possible.', priv_success, TESTS[2][1])
 
 # 4. Error Message Consistency Test
-resp1 = session.post(BASE_URL, data={"email": "notanemail"})
-resp2 = session.post(BASE_URL, data={"email": email})
-err_consistent = (resp1.text == resp2.text) or ('Invalid' in resp1.text and 'Invalid' not in resp2.text)
-add_result(TESTS[3][0], resp1.status_code, 'Error messages are consistent.' if err_consistent else 'Error messages differ!', err_consistent, TESTS[3][1])
+async def check_error_consistency(http, add_result):
+    resp1 = await session.post(BASE_URL, data={"email": "notanemail"})
+    resp2 = await session.post(BASE_URL, data={"email": email})
+    err_consistent = (resp1.text == resp2.text) or ('Invalid' in resp1.text and 'Invalid' not in resp2.text)
+    add_result(TESTS[3][0], resp1.status_code, 'Error messages are consistent.' if err_consistent else 'Error messages differ!', err_consistent, TESTS[3][1])
 
 # 5. Password Change Policy Test
-resp = session.post(BASE_URL, data={"change_pw": "1", "new_password": "a", "confirm": "a"})
-policy_success = 'at least' in resp.text.lower() or 'invalid' in resp.text.lower() or 'error' in resp.text.lower()
-add_result(TESTS[4][0], resp.status_code, 'Weak password rejected.' if policy_success else 'Weak password accepted!', policy_success, TESTS[4][1])
+async def check_password_policy(http, add_result):
+    resp = await session.post(BASE_URL, data={"change_pw": "1", "new_password": "a", "confirm": "a"})
+    policy_success = 'at least' in resp.text.lower() or 'invalid' in resp.text.lower() or 'error' in resp.text.lower()
+    add_result(TESTS[4][0], resp.status_code, 'Weak password rejected.' if policy_success else 'Weak password accepted!', policy_success, TESTS[4][1])
 
 # 6. CSRF Protection Test
-resp = session.get(BASE_URL)
-csrf_success = 'csrf' in resp.text.lower()
-add_result(TESTS[5][0], resp.status_code, 'CSRF token found.' if csrf_success else 'No CSRF token found.', csrf_success, TESTS[5][1])
+async def check_csrf(http, add_result):
+    resp = await session.get(BASE_URL)
+    csrf_success = 'csrf' in resp.text.lower()
+    add_result(TESTS[5][0], resp.status_code, 'CSRF token found.' if csrf_success else 'No CSRF token found.', csrf_success, TESTS[5][1])
 
 # 7. Timing Attack Test
-def measure_time(email):
-    start = time.time()
-    session.post(BASE_URL, data={"email": email})
-    return time.time() - start
-valid_time = measure_time(email)
-invalid_time = measure_time("notanemail")
-timing_success = abs(valid_time - invalid_time) < 0.05
-add_result(TESTS[6][0], 'N/A', f'Valid email time: {valid_time:.4f}s, Invalid email time: {invalid_time:.4f}s', timing_success, TESTS[6][1])
-
-# Save report with timestamp
-report_dir = 'test reports'
-os.makedirs(report_dir, exist_ok=True)
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-report_filename = f'profile_security_report_{timestamp}.html'
-report_path = os.path.join(report_dir, report_filename)
-
-# Write results to HTML file
-html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Profile Security Test Report</title>
-    <meta name='viewport' content='width=device-width, initial-scale=1'>
-    <style>
-        body {{ font-family: 'Segoe UI', Arial, sans-serif; background: #f4f4f4; margin: 0; padding: 0; }}
-        .container {{ max-width: 950px; margin: 40px auto; background: #fff; padding: 30px; border-radius: 12px; box-shadow: 0 4px 16px #bbb; }}
-        h1 {{ text-align: center; color: #222; letter-spacing: 1px; }}
-        .legend {{ margin: 20px 0; text-align: center; }}
-        .legend span {{ display: inline-block; width: 20px; height: 20px; border-radius: 3px; margin-right: 8px; }}
-        .test-card {{ margin: 24px 0; padding: 18px 20px; border-radius: 10px; box-shadow: 0 2px 8px #e0e0e0; transition: box-shadow 0.2s; }}
-        .test-card:hover {{ box-shadow: 0 4px 16px #b0b0b0; }}
-        .test-header {{ display: flex; align-items: center; font-size: 1.2em; margin-bottom: 6px; }}
-        .test-icon {{ font-size: 1.5em; margin-right: 12px; }}
-        .test-title {{ font-weight: bold; color: #222; }}
-        .test-desc {{ color: #555; margin-bottom: 8px; font-size: 0.98em; }}
-        .test-status {{ margin-bottom: 6px; }}
-        .test-details pre {{ background: #f8f9fa; padding: 10px; border-radius: 6px; font-size: 0.97em; overflow-x: auto; }}
-        h2 {{ color: #1a73e8; margin-top: 40px; }}
-        ul {{ margin-left: 20px; }}
-        @media (max-width: 600px) {{
-            .container {{ padding: 10px; }}
-            .test-card {{ padding: 10px 6px; }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Profile Security Test Report</h1>
-        <p><b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        <div class="legend">
-            <b>Legend:</b>
-            <span style="background:#e6ffed; border:2px solid #28a745"></span> Pass
-            <span style="background:#ffeaea; border:2px solid #dc3545"></span> Fail
-        </div>
-        {''.join(results)}
-        <h2>Recommendations</h2>
-        <ul>
-            {''.join(recommendations) if recommendations else '<li>All tests passed. No critical issues detected.</li>'}
-        </ul>
-    </div>
-</body>
-</html>
-"""
-
-with open(report_path, 'w') as f:
-    f.write(html)
-
-print(f"\nReport saved to {report_path}") 
\ No newline at end of file
+async def check_timing_attack(http, add_result):
+    def probe(email):
+        return lambda: session.post(BASE_URL, data={"email": email})
+    result = await timing_analysis.compare(probe(email), probe("notanemail"), min_effect=0.05)
+    timing_success = timing_analysis.passed(result)
+    add_result(TESTS[6][0], 'N/A', timing_analysis.describe(result, 'Valid email', 'Invalid email'), timing_success, TESTS[6][1])
+
+CHECKS = [
+    check_auth_required,
+    check_input_validation,
+    check_privilege_escalation,
+    check_error_consistency,
+    check_password_policy,
+    check_csrf,
+    check_timing_attack,
+]
+
+
+if __name__ == '__main__':
+    http = http_client.client()
+    http_client.run_sync(setup(http))
+    for check in CHECKS:
+        http_client.run_sync(check(http, add_result))
+    write_report()
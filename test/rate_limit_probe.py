@@ -0,0 +1,135 @@
+"""Adaptive rate-limit discovery for the "Rate Limiting" and "Account Lockout" checks.
+
+Instead of sending a fixed number of requests with a fixed pause between them,
+``discover`` finds out whether an endpoint throttles, after how many requests
+(the threshold) and for how long (the window):
+
+* Requests are sent in bursts of 1, 2, 4, ... until one is throttled or the
+  request budget is used up. Throttled requests are not expected to count
+  against the limit, so the number accepted before the first throttled one is
+  the threshold, e.g. 5 for the ``login_attempts`` limiter in app.py.
+* Measuring the window means keeping the endpoint saturated for about as
+  long as the window, so it is measured within a time budget: ``max_window``
+  seconds, DEFAULT_MAX_WINDOW unless SCAN_RATE_LIMIT_MAX_WINDOW sets another
+  for the whole scan (0 reports the threshold only). Single probes are sent
+  at exponentially growing delays after the start of the saturating burst
+  until one is accepted, and the bracket is then bisected.
+  An accepted probe starts a new round: the endpoint is saturated again
+  right away and the next probe is timed from that burst. Every wait is
+  derived from the current bracket, so there is no fixed back-off.
+
+A throttled probe always proves a lower bound for the window. An accepted probe
+only proves an upper bound when its round accepted the full threshold, since
+otherwise older requests (from earlier checks, say) still held part of the
+quota and expire sooner. Such rounds are simply repeated.
+
+Discovery stops once the bracket is narrower than ``resolution`` of its upper
+end, or when the next probe would be later than ``max_window`` seconds; the
+window is then reported as longer than the last throttled delay.
+
+An endpoint is left saturated afterwards, so a suite runs its probe after
+the other checks that use the same endpoint.
+"""
+import os
+import time
+from collections import namedtuple
+
+# Probes go out at 0.25, 0.5, 1, 2 and 4s: about as long as the fixed pauses
+# of the old checks, and enough to tell a burst limit from a per-minute one.
+DEFAULT_MAX_WINDOW = 5.0
+MAX_WINDOW = float(os.environ.get('SCAN_RATE_LIMIT_MAX_WINDOW') or DEFAULT_MAX_WINDOW)
+
+RateLimit = namedtuple('RateLimit', 'limited threshold window_low window_high requests status')
+
+
+async def discover(http, send, is_limited, max_requests=10, max_window=None, resolution=0.1, first_delay=0.25):
+    """Probe ``send`` for a rate limit and return a RateLimit.
+
+    ``send`` is a zero-argument callable returning an awaitable response and
+    ``is_limited(resp)`` tells whether a response was throttled. At most
+    ``max_requests`` requests are sent per burst. The window is measured for
+    up to ``max_window`` seconds (MAX_WINDOW by default, 0 to skip it).
+    """
+    if max_window is None:
+        max_window = MAX_WINDOW
+    requests = 0
+    status = None
+
+    async def burst(expected):
+        """Send bursts until one request is throttled.
+
+        Returns the number of accepted requests and whether any was throttled.
+        """
+        nonlocal requests, status
+        accepted, size = 0, max(1, expected)
+        while accepted < max_requests:
+            size = min(size, max_requests - accepted)
+            resps = await http.gather(*(send() for _ in range(size)))
+            requests += len(resps)
+            status = resps[-1].status_code
+            limited = sum(1 for resp in resps if is_limited(resp))
+            accepted += len(resps) - limited
+            if limited:
+                return accepted, True
+            size *= 2
+        return accepted, False
+
+    round_start = time.monotonic()
+    accepted, throttled = await burst(1)
+    if not throttled:
+        return RateLimit(False, None, None, None, requests, status)
+
+    threshold = accepted
+    if not max_window:
+        return RateLimit(True, threshold, None, None, requests, status)
+    lo = 0.0
+    # Upper bounds seen so far, keyed by how many requests their round accepted.
+    uppers = {}
+
+    def trusted_hi():
+        hi = uppers.get(threshold)
+        return hi if hi is not None and hi > lo else None
+
+    while True:
+        hi = trusted_hi()
+        if hi is not None and hi - lo <= resolution * hi:
+            break
+        delay = (lo + hi) / 2 if hi is not None else max(2 * lo, first_delay)
+        if delay > max_window:
+            break
+        await http.sleep(max(0.0, round_start + delay - time.monotonic()))
+        probe_time = time.monotonic()
+        resp = await send()
+        requests += 1
+        status = resp.status_code
+        if is_limited(resp):
+            lo = max(lo, probe_time - round_start)
+            continue
+        # The probe got through: record the bound and saturate again.
+        bound = time.monotonic() - round_start
+        uppers[accepted] = min(uppers.get(accepted, bound), bound)
+        round_start = probe_time
+        more, throttled = await burst(threshold - 1)
+        accepted = 1 + more
+        threshold = max(threshold, accepted)
+        if not throttled:
+            # No longer throttled within the budget; the bound so far is all we know.
+            break
+
+    return RateLimit(True, threshold, lo, trusted_hi(), requests, status)
+
+
+def describe(result):
+    if not result.limited:
+        return f'No rate limiting detected after {result.requests} requests.'
+    if result.threshold:
+        triggered = f'Rate limiting triggered after {result.threshold} accepted requests.'
+    else:
+        triggered = 'Rate limiting already in effect (earlier requests used up the limit).'
+    if result.window_low is None:
+        return f'{triggered}\nThrottle window not measured ({result.requests} requests sent)'
+    if result.window_high is None:
+        window = f'longer than {result.window_low:.1f}s'
+    else:
+        window = f'between {result.window_low:.1f}s and {result.window_high:.1f}s'
+    return f'{triggered}\nThrottle window: {window} ({result.requests} requests sent)'
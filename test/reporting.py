@@ -0,0 +1,265 @@
+"""Shared report writer for the security suites.
+
+Every suite used to carry its own copy of ``add_result``, the ``results`` and
+``recommendations`` lists and a ~50-line HTML f-string that built the whole
+report in memory. A suite now creates one ``Report`` and uses its
+``add_result`` and ``close`` methods instead:
+
+    report = reporting.Report('login', 'Login Security Test Report', TEST_FIXES)
+    add_result = report.add_result
+    write_report = report.close
+
+The page templates are formatted once per report, and each result is written
+to disk as soon as it is added, so a scan with thousands of results never
+holds more than one card in memory. Parts that have to follow all the cards
+(the HTML recommendations list, the JUnit test cases whose totals go in the
+opening tag) are spooled to a temporary file and copied over on close.
+
+Besides the HTML report, a JSON document and a JUnit XML file (for CI) can be
+written next to it. The formats are taken from SCAN_REPORT_FORMATS (a comma
+separated list of html, json and junit; default html) and can be changed with
+``configure()``.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from html import escape
+from xml.sax.saxutils import quoteattr, escape as xml_escape
+
+REPORT_DIR = 'test reports'
+FORMAT_CHOICES = ('html', 'json', 'junit')
+FORMATS = tuple(f.strip() for f in os.environ.get('SCAN_REPORT_FORMATS', 'html').split(',') if f.strip())
+
+NO_FIX = "No fix suggestion available."
+
+
+def configure(formats=None, report_dir=None):
+    """Change the output formats and directory for reports opened from now on."""
+    global FORMATS, REPORT_DIR
+    if formats is not None:
+        unknown = set(formats) - set(FORMAT_CHOICES)
+        if not formats:
+            raise ValueError('at least one report format is required')
+        if unknown:
+            raise ValueError(f'unknown report format(s): {", ".join(sorted(unknown))}')
+        FORMATS = tuple(formats)
+    if report_dir is not None:
+        REPORT_DIR = report_dir
+
+
+_STYLE = """
+            body { font-family: 'Segoe UI', Arial, sans-serif; background: #f4f4f4; margin: 0; padding: 0; }
+            .container { max-width: 950px; margin: 40px auto; background: #fff; padding: 30px; border-radius: 12px; box-shadow: 0 4px 16px #bbb; }
+            h1 { text-align: center; color: #222; letter-spacing: 1px; }
+            .legend { margin: 20px 0; text-align: center; }
+            .legend span { display: inline-block; width: 20px; height: 20px; border-radius: 3px; margin-right: 8px; }
+            .test-card { margin: 24px 0; padding: 18px 20px; border-radius: 10px; box-shadow: 0 2px 8px #e0e0e0; transition: box-shadow 0.2s; }
+            .test-card:hover { box-shadow: 0 4px 16px #b0b0b0; }
+            .test-header { display: flex; align-items: center; font-size: 1.2em; margin-bottom: 6px; }
+            .test-icon { font-size: 1.5em; margin-right: 12px; }
+            .test-title { font-weight: bold; color: #222; }
+            .test-desc { color: #555; margin-bottom: 8px; font-size: 0.98em; }
+            .test-status { margin-bottom: 6px; }
+            .test-details pre { background: #f8f9fa; padding: 10px; border-radius: 6px; font-size: 0.97em; overflow-x: auto; }
+            h2 { color: #1a73e8; margin-top: 40px; }
+            ul { margin-left: 20px; }
+            @media (max-width: 600px) {
+                .container { padding: 10px; }
+                .test-card { padding: 10px 6px; }
+            }
+        """
+
+_HTML_HEAD = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>{title}</title>
+        <meta name='viewport' content='width=device-width, initial-scale=1'>
+        <style>{style}</style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>{title}</h1>
+            <p><b>Date:</b> {date}</p>
+            <div class="legend">
+                <b>Legend:</b>
+                <span style="background:#e6ffed; border:2px solid #28a745"></span> Pass
+                <span style="background:#ffeaea; border:2px solid #dc3545"></span> Fail
+            </div>
+"""
+
+_HTML_CARD = """
+    <div class="test-card" style="background:{color};border:{border};">
+        <div class="test-header">
+            <span class="test-icon">{icon}</span>
+            <span class="test-title">{title}</span>
+        </div>
+        <div class="test-desc">{description}</div>
+        <div class="test-status"><b>Status:</b> {status}</div>
+        <div class="test-details"><pre>{details}</pre></div>
+    </div>
+    """
+
+_HTML_RECOMMENDATION = '<li><b>{title}:</b> {description}<br><span style="color:#1a73e8"><b>How to fix:</b> {fix}</span></li>'
+
+_HTML_MIDDLE = """
+            <h2>Recommendations</h2>
+            <ul>
+                """
+
+_HTML_ALL_PASSED = '<li>All tests passed. No critical issues detected.</li>'
+
+_HTML_TAIL = """
+            </ul>
+        </div>
+    </body>
+    </html>
+    """
+
+# Characters that are not allowed anywhere in an XML 1.0 document.
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xml_text(value):
+    return xml_escape(_XML_INVALID.sub('', str(value)))
+
+
+def _xml_attr(value):
+    return quoteattr(_XML_INVALID.sub('', str(value)))
+
+
+class _HtmlWriter:
+    def __init__(self, path, report):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(_HTML_HEAD.format(title=escape(report.title), style=_STYLE, date=report.started.strftime('%Y-%m-%d %H:%M:%S')))
+        self.recommendations = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def write(self, title, status, details, success, description, fix):
+        self.file.write(_HTML_CARD.format(
+            color='#e6ffed' if success else '#ffeaea',
+            border='2px solid #28a745' if success else '2px solid #dc3545',
+            icon='✅' if success else '❌',
+            title=escape(str(title)), description=escape(str(description)),
+            status=escape(str(status)), details=escape(str(details)),
+        ))
+        if not success:
+            self.recommendations.write(_HTML_RECOMMENDATION.format(
+                title=escape(str(title)), description=escape(str(description)), fix=escape(fix)))
+
+    def close(self, report):
+        self.file.write(_HTML_MIDDLE)
+        if report.failed:
+            self.recommendations.seek(0)
+            shutil.copyfileobj(self.recommendations, self.file)
+        else:
+            self.file.write(_HTML_ALL_PASSED)
+        self.file.write(_HTML_TAIL)
+        self.recommendations.close()
+        self.file.close()
+
+
+class _JsonWriter:
+    def __init__(self, path, report):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write('{"suite": %s, "title": %s, "date": %s, "results": [' % (
+            json.dumps(report.name), json.dumps(report.title), json.dumps(report.started.isoformat(timespec='seconds'))))
+        self.first = True
+
+    def write(self, title, status, details, success, description, fix):
+        entry = {'title': title, 'status': status, 'success': bool(success), 'description': description, 'details': details}
+        if not success:
+            entry['fix'] = fix
+        self.file.write(('\n  ' if self.first else ',\n  ') + json.dumps(entry, default=str))
+        self.first = False
+
+    def close(self, report):
+        summary = {'total': report.total, 'passed': report.total - report.failed, 'failed': report.failed}
+        self.file.write('\n], "summary": %s}\n' % json.dumps(summary))
+        self.file.close()
+
+
+class _JUnitWriter:
+    def __init__(self, path, report):
+        self.path = path
+        self.suite_name = report.name
+        self.cases = tempfile.TemporaryFile('w+', encoding='utf-8')
+        # Suites report several results under one title; number the repeats
+        # so every test case has a distinct name.
+        self.seen = {}
+
+    def write(self, title, status, details, success, description, fix):
+        count = self.seen[title] = self.seen.get(title, 0) + 1
+        name = title if count == 1 else f'{title} #{count}'
+        self.cases.write(f'  <testcase classname={_xml_attr(self.suite_name)} name={_xml_attr(name)}>\n')
+        if status == 'Error':
+            self.cases.write(f'    <error message={_xml_attr(description)}>{_xml_text(details)}</error>\n')
+        elif not success:
+            self.cases.write(f'    <failure message={_xml_attr(description)}>{_xml_text(details)}\nHow to fix: {_xml_text(fix)}</failure>\n')
+        self.cases.write(f'    <system-out>Status: {_xml_text(status)}\n{_xml_text(details)}</system-out>\n  </testcase>\n')
+
+    def close(self, report):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            f.write(f'<testsuite name={_xml_attr(report.name)} tests="{report.total}" failures="{report.failed - report.errors}" '
+                    f'errors="{report.errors}" timestamp="{report.started.isoformat(timespec="seconds")}">\n')
+            self.cases.seek(0)
+            shutil.copyfileobj(self.cases, f)
+            f.write('</testsuite>\n')
+        self.cases.close()
+
+
+_WRITERS = {'html': ('html', _HtmlWriter), 'json': ('json', _JsonWriter), 'junit': ('xml', _JUnitWriter)}
+
+
+class Report:
+    """Streams one suite's results into the configured report files.
+
+    The files are opened on the first ``add_result`` (or on ``close`` if there
+    were no results) and finished by ``close``, which returns the path of the
+    HTML report, or of the first file written if HTML is not among the formats.
+    """
+
+    def __init__(self, name, title, fixes):
+        self.name = name
+        self.title = title
+        self.fixes = fixes
+        self.writers = None
+
+    def _open(self):
+        self.started = datetime.now()
+        self.total = self.failed = self.errors = 0
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        timestamp = self.started.strftime('%Y%m%d_%H%M%S')
+        self.paths = []
+        self.writers = []
+        for fmt in FORMATS:
+            extension, writer_class = _WRITERS[fmt]
+            path = os.path.join(REPORT_DIR, f'{self.name}_security_report_{timestamp}.{extension}')
+            self.paths.append(path)
+            self.writers.append(writer_class(path, self))
+
+    def add_result(self, title, status, details, success, description):
+        if self.writers is None:
+            self._open()
+        self.total += 1
+        if not success:
+            self.failed += 1
+            if status == 'Error':
+                self.errors += 1
+        fix = self.fixes.get(title, NO_FIX)
+        for writer in self.writers:
+            writer.write(title, status, details, success, description, fix)
+
+    def close(self):
+        if self.writers is None:
+            self._open()
+        for writer in self.writers:
+            writer.close(self)
+        self.writers = None
+        for path in self.paths:
+            print(f"\nReport saved to {path}")
+        html = [path for path in self.paths if path.endswith('.html')]
+        return (html or self.paths)[0]
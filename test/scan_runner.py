@@ -0,0 +1,257 @@
+"""Run every *_security_test.py suite in a single sweep.
+
+Each suite exposes its numbered tests as CHECKS, a list of coroutine functions
+taking an HTTP client and an ``add_result`` function. Suites may also define
+``setup(http)`` (run once before their checks), ``SERIAL_GROUPS`` (tuples of
+checks that share server-side state and must run in order) and ``DESTRUCTIVE``
+(run only after every other suite has finished). Results are replayed into the
+suite's own ``add_result`` in declared order as soon as every earlier check of
+the suite has finished, so the reports match a standalone run and are written
+while the scan is still going.
+
+By default independent checks run concurrently on a bounded thread pool using
+the blocking client from http_client.py. With ``--async`` the same checks run
+on one event loop through async_engine.py instead, limited by a global
+``--concurrency`` cap and a ``--per-endpoint`` cap.
+
+Usage:
+    python3 scan_runner.py                  # all suites
+    python3 scan_runner.py login search     # selected suites
+    python3 scan_runner.py --workers 4 --pool-size 8
+    python3 scan_runner.py --async --concurrency 200 --per-endpoint 20
+    python3 scan_runner.py --formats html,json,junit
+"""
+import argparse
+import asyncio
+import glob
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import async_engine
+import http_client
+import reporting
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITE_SUFFIX = '_security_test'
+
+
+class CheckRun:
+    """One check of one suite, with the results it reported and its wall time."""
+
+    def __init__(self, suite, check):
+        self.suite = suite
+        self.check = check
+        self.name = check.__name__[len('check_'):] if check.__name__.startswith('check_') else check.__name__
+        self.results = []
+        self.failures = 0
+        self.elapsed = 0.0
+        self.error = None
+        self.done = False
+
+    def record(self, *args):
+        self.results.append(args)
+        if not args[3]:
+            self.failures += 1
+
+    @property
+    def passed(self):
+        return self.error is None and self.failures == 0
+
+
+class ReportFeed:
+    """Passes finished checks' results to a suite's report in declared order.
+
+    Results of a check are held only until every check declared before it has
+    finished; then they are handed to the suite's ``add_result`` and dropped.
+    """
+
+    def __init__(self, suite, runs):
+        self.suite = suite
+        self.runs = runs
+        self.next = 0
+        self.lock = threading.Lock()
+
+    def finished(self, run):
+        with self.lock:
+            run.done = True
+            while self.next < len(self.runs) and self.runs[self.next].done:
+                self._flush(self.runs[self.next])
+                self.next += 1
+
+    def _flush(self, run):
+        for result in run.results:
+            self.suite.add_result(*result)
+        if run.error is not None:
+            self.suite.add_result(run.name, 'Error', repr(run.error), False, 'The check raised an exception before it could report a result.')
+        run.results = []
+
+    def close(self):
+        for run in self.runs:
+            if not run.done:
+                self.finished(run)
+        return self.suite.write_report()
+
+
+def suite_name(module):
+    return module.__name__[:-len(SUITE_SUFFIX)]
+
+
+def discover_suites(names=None):
+    if SUITE_DIR not in sys.path:
+        sys.path.insert(0, SUITE_DIR)
+    modules = []
+    for path in sorted(glob.glob(os.path.join(SUITE_DIR, f'*{SUITE_SUFFIX}.py'))):
+        module_name = os.path.basename(path)[:-3]
+        if names and module_name[:-len(SUITE_SUFFIX)] not in names:
+            continue
+        modules.append(importlib.import_module(module_name))
+    return modules
+
+
+def plan_jobs(suite, runs):
+    """Split a suite's checks into jobs; checks in one serial group share a job."""
+    by_check = {run.check: run for run in runs}
+    grouped = {}
+    for group in getattr(suite, 'SERIAL_GROUPS', []):
+        for check in group:
+            grouped[check] = group
+    jobs, seen = [], set()
+    for run in runs:
+        group = grouped.get(run.check, (run.check,))
+        if group not in seen:
+            seen.add(group)
+            jobs.append([by_check[check] for check in group])
+    return jobs
+
+
+def run_job(http, job, feed):
+    for run in job:
+        start = time.perf_counter()
+        try:
+            http_client.run_sync(run.check(http, run.record))
+        except Exception as e:
+            run.error = e
+        run.elapsed = time.perf_counter() - start
+        feed.finished(run)
+
+
+def run_setup(suite, http, runs):
+    setup = getattr(suite, 'setup', None)
+    if setup is None:
+        return True
+    try:
+        http_client.run_sync(setup(http))
+    except Exception as e:
+        for run in runs:
+            run.error = e
+        return False
+    return True
+
+
+def run_phase(pool, suites, runs_by_suite, feeds):
+    clients = {suite: http_client.client() for suite in suites}
+    ready = dict(zip(suites, pool.map(lambda s: run_setup(s, clients[s], runs_by_suite[s]), suites)))
+    futures = []
+    for suite in suites:
+        if ready[suite]:
+            futures += [pool.submit(run_job, clients[suite], job, feeds[suite]) for job in plan_jobs(suite, runs_by_suite[suite])]
+    wait(futures)
+
+
+async def run_job_async(http, job, feed):
+    for run in job:
+        start = time.perf_counter()
+        try:
+            await run.check(http, run.record)
+        except Exception as e:
+            run.error = e
+        run.elapsed = time.perf_counter() - start
+        feed.finished(run)
+
+
+async def run_setup_async(suite, http, runs):
+    setup = getattr(suite, 'setup', None)
+    if setup is None:
+        return True
+    try:
+        await setup(http)
+    except Exception as e:
+        for run in runs:
+            run.error = e
+        return False
+    return True
+
+
+async def run_phases_async(phases, runs_by_suite, feeds, concurrency, per_endpoint):
+    engine = async_engine.Engine(concurrency, per_endpoint)
+    try:
+        for suites in phases:
+            clients = {suite: engine.client() for suite in suites}
+            ready = await asyncio.gather(*(run_setup_async(s, clients[s], runs_by_suite[s]) for s in suites))
+            jobs = []
+            for suite, ok in zip(suites, ready):
+                if ok:
+                    jobs += [run_job_async(clients[suite], job, feeds[suite]) for job in plan_jobs(suite, runs_by_suite[suite])]
+            await asyncio.gather(*jobs)
+    finally:
+        await engine.close()
+
+
+def write_reports(suites, feeds):
+    for suite in suites:
+        feeds[suite].close()
+
+
+def print_summary(suites, runs_by_suite, wall_time):
+    print(f"\n{'Suite':<16} {'Check':<34} {'Time':>9}  Result")
+    total = 0.0
+    for suite in suites:
+        for run in runs_by_suite[suite]:
+            total += run.elapsed
+            outcome = 'PASS' if run.passed else ('ERROR' if run.error else 'FAIL')
+            print(f'{suite_name(suite):<16} {run.name:<34} {run.elapsed:>8.3f}s  {outcome}')
+    print(f'\nWall time: {wall_time:.3f}s (sum of check times: {total:.3f}s)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the security test suites concurrently.')
+    parser.add_argument('suites', nargs='*', help='suite names to run, e.g. login search (default: all)')
+    parser.add_argument('-w', '--workers', type=int, default=16, help='maximum number of checks running at once')
+    parser.add_argument('--pool-size', type=int, help='keep-alive connections per host (default: one per worker)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='run every check on one asyncio event loop (needs aiohttp)')
+    parser.add_argument('--concurrency', type=int, default=async_engine.DEFAULT_CONCURRENCY, help='async mode: maximum requests in flight overall')
+    parser.add_argument('--per-endpoint', type=int, default=async_engine.DEFAULT_PER_ENDPOINT, help='async mode: maximum requests in flight per endpoint')
+    parser.add_argument('--formats', default=','.join(reporting.FORMATS), help='report formats, comma separated: html, json, junit (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    http_client.configure(pool_maxsize=args.pool_size or args.workers)
+    try:
+        reporting.configure(formats=[f.strip() for f in args.formats.split(',') if f.strip()])
+    except ValueError as e:
+        parser.error(str(e))
+
+    suites = discover_suites(args.suites)
+    runs_by_suite = {suite: [CheckRun(suite, check) for check in suite.CHECKS] for suite in suites}
+    feeds = {suite: ReportFeed(suite, runs_by_suite[suite]) for suite in suites}
+    phases = [
+        [suite for suite in suites if not getattr(suite, 'DESTRUCTIVE', False)],
+        [suite for suite in suites if getattr(suite, 'DESTRUCTIVE', False)],
+    ]
+    start = time.perf_counter()
+    if args.use_async:
+        asyncio.run(run_phases_async(phases, runs_by_suite, feeds, args.concurrency, args.per_endpoint))
+    else:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for phase in phases:
+                run_phase(pool, phase, runs_by_suite, feeds)
+    wall_time = time.perf_counter() - start
+    write_reports(suites, feeds)
+    print_summary(suites, runs_by_suite, wall_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Statistical timing-leak detection for the "Timing Attack Test" checks.
+
+A single request per class compared against a fixed threshold mostly measures
+scheduler and network noise. ``compare`` instead collects many samples of two
+request classes, interleaved in random order so drift affects both equally,
+timed with ``time.perf_counter_ns``. After each batch it:
+
+* drops outliers in each class with Tukey fences (1.5 x IQR),
+* runs a two-sided Mann-Whitney U test (normal approximation with tie
+  correction) to decide whether the classes differ at all, and
+* builds a confidence interval for the difference of the trimmed means.
+
+Sampling stops as soon as the answer is clear: a significant difference of at
+least ``min_effect`` seconds is a leak, and an interval lying entirely inside
++/- ``min_effect`` shows that the classes are equivalent. Each look at the data
+spends an equal share of ``alpha``, so stopping early does not inflate the
+false-positive rate. If neither happens by ``max_samples`` the result is
+marked inconclusive.
+
+Every response is checked with ``is_limited`` (by default, a 429 status). A
+rate-limited endpoint answers with the same throttle page whatever was asked,
+so once one sample is throttled sampling stops and the result is marked
+throttled and inconclusive; ``passed`` does not count it as a pass.
+
+Probes are zero-argument callables returning an awaitable response, so the
+same code runs on the blocking and the asyncio clients.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+TimingResult = namedtuple('TimingResult', [
+    'leak', 'conclusive', 'samples', 'median_a', 'median_b',
+    'difference', 'ci_low', 'ci_high', 'p_value', 'throttled',
+])
+
+
+def is_throttled(resp):
+    return resp.status_code == 429
+
+
+def trim_outliers(samples):
+    q1, q3 = np.percentile(samples, [25, 75])
+    spread = 1.5 * (q3 - q1)
+    kept = samples[(samples >= q1 - spread) & (samples <= q3 + spread)]
+    return kept if kept.size >= 2 else samples
+
+
+def mann_whitney_p(a, b):
+    """Two-sided p-value of the Mann-Whitney U test."""
+    n1, n2 = a.size, b.size
+    n = n1 + n2
+    combined = np.concatenate([a, b])
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    # Average rank of each distinct value: ranks run from the end of the
+    # previous group of ties to the end of this one.
+    ends = np.cumsum(counts)
+    ranks = (ends - (counts - 1) / 2.0)[inverse]
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    ties = float((counts ** 3 - counts).sum())
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = max(abs(u - n1 * n2 / 2.0) - 0.5, 0.0) / sigma
+    return math.erfc(z / math.sqrt(2))
+
+
+def analyze(a, b, alpha, min_effect):
+    """Return (leak, equivalent, p_value, difference, ci_low, ci_high) for two sample arrays."""
+    ta, tb = trim_outliers(a), trim_outliers(b)
+    p_value = mann_whitney_p(ta, tb)
+    difference = ta.mean() - tb.mean()
+    se = math.sqrt(ta.var(ddof=1) / ta.size + tb.var(ddof=1) / tb.size)
+    margin = NormalDist().inv_cdf(1 - alpha / 2) * se
+    ci_low, ci_high = difference - margin, difference + margin
+    leak = p_value < alpha and abs(difference) >= min_effect
+    equivalent = -min_effect < ci_low and ci_high < min_effect
+    return leak, equivalent, p_value, difference, ci_low, ci_high
+
+
+async def _timed(probe, times, is_limited):
+    """Time one request into times; return True, without recording it, if it was throttled."""
+    start = time.perf_counter_ns()
+    resp = await probe()
+    elapsed = time.perf_counter_ns() - start
+    if is_limited(resp):
+        return True
+    times.append(elapsed)
+    return False
+
+
+def _throttled_result(times_a, times_b):
+    samples = min(len(times_a), len(times_b))
+    median_a = float(np.median(times_a)) / 1e9 if times_a else math.nan
+    median_b = float(np.median(times_b)) / 1e9 if times_b else math.nan
+    return TimingResult(False, False, samples, median_a, median_b, math.nan, math.nan, math.nan, math.nan, True)
+
+
+async def compare(probe_a, probe_b, min_effect=0.05, alpha=0.01, min_samples=10, max_samples=100, batch=10,
+                  is_limited=is_throttled):
+    """Sample two request classes until they are shown to differ or to match.
+
+    ``min_effect`` is the smallest difference in seconds worth reporting as a
+    leak. ``min_samples`` and ``max_samples`` count samples per class.
+    ``is_limited(resp)`` tells whether a response was throttled.
+    """
+    looks = max(1, math.ceil((max_samples - min_samples) / batch) + 1)
+    look_alpha = alpha / looks
+    times_a, times_b = [], []
+    while True:
+        for _ in range(batch):
+            # Randomise the order within each pair so drift hits both classes.
+            first, second = (probe_a, times_a), (probe_b, times_b)
+            if random.random() >= 0.5:
+                first, second = second, first
+            if await _timed(*first, is_limited) or await _timed(*second, is_limited):
+                return _throttled_result(times_a, times_b)
+        if len(times_a) < min_samples:
+            continue
+        a = np.asarray(times_a, dtype=np.float64) / 1e9
+        b = np.asarray(times_b, dtype=np.float64) / 1e9
+        leak, equivalent, p_value, difference, ci_low, ci_high = analyze(a, b, look_alpha, min_effect)
+        done = leak or equivalent
+        if done or len(times_a) >= max_samples:
+            return TimingResult(leak, done, len(times_a), float(np.median(a)), float(np.median(b)),
+                                difference, ci_low, ci_high, p_value, False)
+
+
+def passed(result):
+    """Whether a timing check passes: no leak found, and not cut short by a rate limit."""
+    return not result.leak and not result.throttled
+
+
+def describe(result, label_a, label_b):
+    if result.throttled:
+        return (f'Rate limited after {result.samples} samples per class; later samples would only time '
+                f'the throttle page.\nInconclusive: timing not compared')
+    verdict = 'timing leak detected' if result.leak else 'no timing leak detected'
+    if not result.conclusive:
+        verdict += ' (inconclusive: sample limit reached)'
+    return (f'{label_a} median: {result.median_a:.4f}s, {label_b} median: {result.median_b:.4f}s\n'
+            f'Difference of trimmed means: {result.difference * 1000:+.2f}ms '
+            f'[{result.ci_low * 1000:+.2f}ms, {result.ci_high * 1000:+.2f}ms]\n'
+            f'Mann-Whitney p-value: {result.p_value:.4g} after {result.samples} samples per class: {verdict}')
@@ -1,27 +1,37 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, make_response, session
+from flask import Flask, render_template, request, redirect, url_for, send_file, make_response, session, jsonify, abort
 import sqlite3
 import os
 import re
-import time
-import hashlib
 import logging
-import signal
+import mimetypes
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import is_resource_modified
+
+import crash_sandbox
+import db
+import error_log
+import migrations
+import passwords
+import ping_runner
+import upload_store
+from rate_limit import RateLimiter
+from db import get_db
 
 app = Flask(__name__)
 app.secret_key = 'change_this_secret_key'
+app.config['DATABASE'] = 'users.db'
+db.init_app(app)
 
 # Vulnerable database setup
 def init_db():
-    conn = sqlite3.connect('users.db')
+    conn = db.connect(app.config['DATABASE'])
+    migrations.migrate(conn)
+    app.config['SEARCH_FTS'] = migrations.has_table(conn, 'users_fts')
+    upload_store.import_folder(conn, app.config['UPLOAD_FOLDER'], upload_store.get_store(app))
     c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY, username TEXT, password TEXT, email TEXT, role TEXT)''')
     c.execute("INSERT OR IGNORE INTO users (id, username, password, email, role) VALUES (1, 'admin', 'secret', 'admin@example.com', 'admin')")
     c.execute("INSERT OR IGNORE INTO users (id, username, password, email, role) VALUES (2, 'alice', 'alicepass', 'alice@example.com', 'user')")
     c.execute("INSERT OR IGNORE INTO users (id, username, password, email, role) VALUES (3, 'bob', 'bobpass', 'bob@example.com', 'user')")
-    # Add comments table for stored XSS
-    c.execute('''CREATE TABLE IF NOT EXISTS comments
-                 (id INTEGER PRIMARY KEY, content TEXT, username TEXT, timestamp TEXT)''')
     conn.commit()
     conn.close()
 
@@ -31,8 +41,20 @@ def init_db():
 #     search_query = request.args.get('search', '')
 #     return render_template('index.html', search_query=search_query)
 
-# Add a simple in-memory rate limiter
-login_attempts = {}
+# Per-client rate limits. /brute-login stays loose on purpose so the brute
+# force demo still works; its limit only stops floods. Set RATE_LIMIT_DATABASE
+# to a file path so several worker processes share one count.
+app.config['RATE_LIMIT_DATABASE'] = os.environ.get('RATE_LIMIT_DATABASE', '')
+login_limiter = RateLimiter('login', 5, 60)
+brute_login_limiter = RateLimiter('brute_login', 100, 60)
+search_limiter = RateLimiter('search', 120, 60)
+ping_limiter = RateLimiter('ping', 30, 60)
+LOGIN_LIMIT_MESSAGE = 'Too many login attempts. Please try again later (rate limit exceeded).'
+
+# Passwords are stored as salted scrypt hashes; see passwords.py. Each step of
+# PASSWORD_WORK_FACTOR doubles the time and memory one hash takes.
+app.config['PASSWORD_WORK_FACTOR'] = int(os.environ.get('PASSWORD_WORK_FACTOR', passwords.DEFAULT_WORK_FACTOR))
+PASSWORDS_BUSY_MESSAGE = 'The server is busy. Please try again shortly.'
 
 # Registration route
 @app.route('/register', methods=['GET', 'POST'])
@@ -44,6 +66,12 @@ def register():
         password = request.form['password']
         email = request.form['email']
         role = 'user'
+        # Hashed before validating, so a rejected sign-up takes as long as an
+        # accepted one.
+        try:
+            hashed = passwords.get_hasher().hash(password)
+        except passwords.Busy:
+            return render_template('register.html', error=PASSWORDS_BUSY_MESSAGE), 503
         if not re.match(r'^[\w-]{3,30}$', username):
             error = 'Username must be 3-30 characters, letters/numbers/underscore/hyphen.'
         elif not re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
@@ -51,17 +79,16 @@ def register():
         elif len(password) < 6:
             error = 'Password must be at least 6 characters.'
         else:
-            conn = sqlite3.connect('users.db')
+            conn = get_db()
             c = conn.cursor()
-            c.execute('SELECT id FROM users WHERE username=? OR email=?', (username, email))
-            if c.fetchone():
-                error = 'Username or email already exists.'
-            else:
-                hashed = hashlib.sha256(password.encode()).hexdigest()
+            # The unique indexes on username and email do the duplicate check
+            # as part of the insert, so two concurrent sign-ups cannot both win.
+            try:
                 c.execute('INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)', (username, hashed, email, role))
                 conn.commit()
-                conn.close()
                 success = 'Registration successful. You can now log in.'
+            except sqlite3.IntegrityError:
+                error = 'Username or email already exists.'
     return render_template('register.html', error=error, success=success)
 
 # Profile view/edit
@@ -69,7 +96,7 @@ def register():
 def profile():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    conn = sqlite3.connect('users.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('SELECT id, username, email, role FROM users WHERE id=?', (session['user_id'],))
     user = c.fetchone()
@@ -80,34 +107,47 @@ def profile():
         if not re.match(r'^[^@]+@[^@]+\.[^@]+$', new_email):
             error = 'Invalid email address.'
         else:
-            c.execute('UPDATE users SET email=? WHERE id=?', (new_email, session['user_id']))
-            conn.commit()
-            success = 'Profile updated.'
-            user = (user[0], user[1], new_email, user[3])
-    conn.close()
+            try:
+                c.execute('UPDATE users SET email=? WHERE id=?', (new_email, session['user_id']))
+                conn.commit()
+                success = 'Profile updated.'
+                user = (user[0], user[1], new_email, user[3])
+            except sqlite3.IntegrityError:
+                error = 'Email address is already in use.'
     return render_template('profile.html', user=user, error=error, success=success)
 
+USERS_PER_PAGE = 50
+MAX_USERS_PER_PAGE = 500
+
 # Enhanced users list with roles and admin delete
 @app.route('/users')
 def users():
-    conn = sqlite3.connect('users.db')
+    # Keyset pagination: each page starts after the last id of the previous
+    # one, so every page is an index range scan on the primary key.
+    after = request.args.get('after', 0, type=int)
+    per_page = min(max(request.args.get('per_page', USERS_PER_PAGE, type=int), 1), MAX_USERS_PER_PAGE)
+    conn = get_db()
     c = conn.cursor()
-    c.execute('SELECT id, username, email, role FROM users')
+    c.execute('SELECT id, username, email, role FROM users WHERE id > ? ORDER BY id LIMIT ?', (after, per_page + 1))
     user_list = c.fetchall()
-    conn.close()
+    next_cursor = user_list[per_page - 1][0] if len(user_list) > per_page else None
+    user_list = user_list[:per_page]
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(users=[dict(zip(('id', 'username', 'email', 'role'), user)) for user in user_list],
+                       next_cursor=next_cursor, per_page=per_page)
     is_admin = session.get('role') == 'admin'
-    return render_template('users.html', users=user_list, is_admin=is_admin)
+    return render_template('users.html', users=user_list, is_admin=is_admin,
+                           after=after, next_cursor=next_cursor, per_page=per_page)
 
 @app.route('/delete-user', methods=['POST'])
 def delete_user():
     if session.get('role') != 'admin':
         return 'Unauthorized', 403
     user_id = request.form['user_id']
-    conn = sqlite3.connect('users.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('DELETE FROM users WHERE id=?', (user_id,))
     conn.commit()
-    conn.close()
     return redirect(url_for('users'))
 
 # Update login to use hashed passwords and set session
@@ -120,22 +160,32 @@ def login():
         if not username or not password or len(username) > 50 or len(password) > 50:
             error = "Invalid input."
             return render_template('login.html', error=error)
+        # Each attempt takes a slot before its password is checked, so
+        # concurrent guesses cannot all get past the limit. Only failed
+        # attempts keep theirs: rejected input never takes one and a
+        # successful login gives it back, so users signing in do not lock
+        # anyone out.
         ip = request.remote_addr
-        now = time.time()
-        attempts = login_attempts.get(ip, [])
-        attempts = [t for t in attempts if now - t < 60]
-        if len(attempts) >= 5:
-            error = "Too many login attempts. Please try again later."
-            return render_template('login.html', error=error)
-        attempts.append(now)
-        login_attempts[ip] = attempts
-        conn = sqlite3.connect('users.db')
+        slot = login_limiter.reserve(ip)
+        if slot is None:
+            return login_limiter.limited_response(LOGIN_LIMIT_MESSAGE,
+                                                  lambda message: render_template('login.html', error=message))
+        conn = get_db()
         c = conn.cursor()
-        hashed = hashlib.sha256(password.encode()).hexdigest()
-        c.execute("SELECT id, username, role FROM users WHERE username=? AND password=?", (username, hashed))
+        c.execute("SELECT id, username, role, password FROM users WHERE username=?", (username,))
         user = c.fetchone()
-        conn.close()
-        if user:
+        try:
+            ok, new_hash = passwords.get_hasher().verify(user[3] if user else None, password)
+        except passwords.Busy:
+            login_limiter.undo(ip, slot)
+            return render_template('login.html', error=PASSWORDS_BUSY_MESSAGE), 503
+        if new_hash:
+            # Legacy SHA-256 row, or an older work factor: upgrade it now that
+            # the password is known. Only if the row was not changed meanwhile.
+            c.execute('UPDATE users SET password=? WHERE id=? AND password=?', (new_hash, user[0], user[3]))
+            conn.commit()
+        if ok:
+            login_limiter.undo(ip, slot)
             session['user_id'] = user[0]
             session['username'] = user[1]
             session['role'] = user[2]
@@ -144,24 +194,52 @@ def login():
             error = "Invalid credentials"
     return render_template('login.html', error=error)
 
+COMMENTS_PER_PAGE = 20
+MAX_COMMENTS_PER_PAGE = 200
+# Replies deeper than this are not loaded with the page; the comment at the
+# limit links to its own thread view instead.
+MAX_REPLY_DEPTH = 6
+
+def load_threads(c, root_ids, order):
+    """Fetch the given top-level comments with their replies, nested.
+
+    Replies are loaded with one recursive query, up to MAX_REPLY_DEPTH levels
+    below each root, and linked to their parents through an id index in a
+    single pass, so the cost is linear in the number of comments shown.
+    """
+    if not root_ids:
+        return []
+    placeholders = ','.join('?' * len(root_ids))
+    c.execute(f'''WITH RECURSIVE thread(id, depth) AS (
+                      SELECT id, 0 FROM comments WHERE id IN ({placeholders})
+                      UNION ALL
+                      SELECT comments.id, thread.depth + 1 FROM comments JOIN thread ON comments.parent_id = thread.id
+                      WHERE comments.deleted = 0 AND thread.depth < ?)
+                  SELECT id, content, username, timestamp, parent_id, score, depth,
+                         (SELECT COUNT(*) FROM comments AS r WHERE r.parent_id = comments.id AND r.deleted = 0)
+                  FROM comments JOIN thread USING (id)
+                  ORDER BY {order}''', (*root_ids, MAX_REPLY_DEPTH))
+    nodes = {}
+    rows = c.fetchall()
+    for row in rows:
+        nodes[row[0]] = {
+            'id': row[0], 'content': row[1], 'username': row[2], 'timestamp': row[3], 'parent_id': row[4],
+            'votes': row[5], 'replies': [],
+            # Replies below the depth limit are left for the thread view.
+            'more_replies': row[7] if row[6] == MAX_REPLY_DEPTH else 0,
+        }
+    roots = set(root_ids)
+    for row in rows:
+        if row[0] not in roots:
+            nodes[row[4]]['replies'].append(nodes[row[0]])
+    return [nodes[i] for i in root_ids if i in nodes]
+
 @app.route('/comments', methods=['GET', 'POST'])
 def comments():
-    conn = sqlite3.connect('users.db')
+    conn = get_db()
     c = conn.cursor()
     error = None
     success = None
-    # Ensure new columns exist
-    try:
-        c.execute("ALTER TABLE comments ADD COLUMN parent_id INTEGER")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        c.execute("ALTER TABLE comments ADD COLUMN deleted INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
-    # Ensure votes table exists
-    c.execute('''CREATE TABLE IF NOT EXISTS comment_votes (
-        id INTEGER PRIMARY KEY, comment_id INTEGER, username TEXT, vote INTEGER)''')
     if request.method == 'POST':
         action = request.form.get('action', 'add')
         if action == 'add':
@@ -205,62 +283,111 @@ def comments():
             if c.fetchone():
                 error = 'You have already voted on this comment.'
             else:
+                # The vote and the comment's running score are committed together.
                 c.execute("INSERT INTO comment_votes (comment_id, username, vote) VALUES (?, ?, ?)", (comment_id, username, vote_val))
+                c.execute("UPDATE comments SET score = score + ? WHERE id=?", (vote_val, comment_id))
                 conn.commit()
                 success = 'Vote recorded.'
-    # Sorting
     sort = request.args.get('sort', 'newest')
-    c.execute("SELECT id, content, username, timestamp, parent_id FROM comments WHERE deleted=0")
-    all_comments = c.fetchall()
-    # Get vote counts for each comment
-    vote_counts = {}
-    for row in all_comments:
-        c.execute("SELECT SUM(vote) FROM comment_votes WHERE comment_id=?", (row[0],))
-        count = c.fetchone()[0] or 0
-        vote_counts[row[0]] = count
-    # Sort comments
-    if sort == 'upvoted':
-        all_comments = sorted(all_comments, key=lambda c: vote_counts.get(c[0], 0), reverse=True)
+    order = 'score DESC, id' if sort == 'upvoted' else 'id DESC'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', COMMENTS_PER_PAGE, type=int), 1), MAX_COMMENTS_PER_PAGE)
+    thread_id = request.args.get('thread', type=int)
+    if thread_id is not None:
+        # Lazy loading: one reply subtree, rooted at the requested comment.
+        c.execute("SELECT id FROM comments WHERE id=? AND deleted=0", (thread_id,))
+        root_ids = [row[0] for row in c.fetchall()]
+        total = len(root_ids)
     else:
-        all_comments = sorted(all_comments, key=lambda c: c[0], reverse=True)
-    conn.close()
-    # Build threaded structure
-    def build_thread(comments, parent=None):
-        thread = []
-        for c in comments:
-            if c[4] == parent:
-                replies = build_thread(comments, c[0])
-                thread.append({
-                    'id': c[0], 'content': c[1], 'username': c[2], 'timestamp': c[3], 'parent_id': c[4], 'replies': replies, 'votes': vote_counts.get(c[0], 0)
-                })
-        return thread
-    comment_thread = build_thread(all_comments)
-    return render_template('comments.html', comments=comment_thread, error=error, success=success, sort=sort)
+        c.execute("SELECT COUNT(*) FROM comments WHERE parent_id IS NULL AND deleted=0")
+        total = c.fetchone()[0]
+        c.execute(f"SELECT id FROM comments WHERE parent_id IS NULL AND deleted=0 ORDER BY {order} LIMIT ? OFFSET ?",
+                  (per_page, (page - 1) * per_page))
+        root_ids = [row[0] for row in c.fetchall()]
+    comment_thread = load_threads(c, root_ids, order)
+    pages = max((total + per_page - 1) // per_page, 1)
+    return render_template('comments.html', comments=comment_thread, error=error, success=success, sort=sort,
+                           page=page, pages=pages, per_page=per_page, thread_id=thread_id)
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploaded content lives here, stored once per SHA-256; see upload_store.py.
+app.config['UPLOAD_STORE'] = os.path.join(UPLOAD_FOLDER, '.store')
+app.config['UPLOAD_MAX_BYTES'] = int(os.environ.get('UPLOAD_MAX_BYTES', upload_store.DEFAULT_MAX_BYTES))
+# Hand file bodies to the front-end server instead of reading them in Python:
+# USE_X_SENDFILE=1 for Apache/lighttpd, or UPLOAD_ACCEL_REDIRECT=<internal
+# location mapped to UPLOAD_STORE> for nginx.
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+app.config['UPLOAD_ACCEL_REDIRECT'] = os.environ.get('UPLOAD_ACCEL_REDIRECT', '')
+UPLOADS_PER_PAGE = 50
+MAX_UPLOADS_PER_PAGE = 500
 
 @app.route('/upload', methods=['GET', 'POST'])
 def upload():
     message = None
+    status = 200
     if request.method == 'POST':
-        if 'file' not in request.files:
-            message = 'No file part'
+        # The body is streamed to a temporary file, which either becomes a new
+        # blob or is dropped if the same content is already stored.
+        store = upload_store.get_store()
+        try:
+            _, uploaded = upload_store.receive(request.environ, store.tmp, app.config['UPLOAD_MAX_BYTES'])
+        except RequestEntityTooLarge:
+            message = f"File too large: the limit is {app.config['UPLOAD_MAX_BYTES'] // 1024} KB."
+            status = 413
         else:
-            file = request.files['file']
-            if file.filename == '':
-                message = 'No selected file'
-            else:
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-                file.save(filepath)
-                message = f'File {file.filename} uploaded!'
-    files = os.listdir(app.config['UPLOAD_FOLDER'])
-    return render_template('upload.html', message=message, files=files)
+            try:
+                if 'file' not in uploaded:
+                    message = 'No file part'
+                else:
+                    file = uploaded['file']
+                    if file.filename == '':
+                        message = 'No selected file'
+                    else:
+                        store.add(file.stream)
+                        upload_store.record(get_db(), file.filename, file.stream.sha256, file.stream.size)
+                        message = f'File {file.filename} uploaded!'
+            finally:
+                for _, part in uploaded.items(multi=True):
+                    part.stream.discard()
+    # Listed from the uploads index a page at a time, by name.
+    after = request.args.get('after', '')
+    per_page = min(max(request.args.get('per_page', UPLOADS_PER_PAGE, type=int), 1), MAX_UPLOADS_PER_PAGE)
+    files, next_cursor = upload_store.list_page(get_db(), after, per_page)
+    if request.method == 'GET' and (request.args.get('format') == 'json'
+                                    or request.accept_mimetypes.best == 'application/json'):
+        return jsonify(files=[dict(zip(('name', 'size', 'uploaded_at'), file)) for file in files],
+                       next_cursor=next_cursor, per_page=per_page)
+    return render_template('upload.html', message=message, files=files,
+                           after=after, next_cursor=next_cursor, per_page=per_page), status
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    row = upload_store.lookup(get_db(), filename)
+    if row is None:
+        abort(404)
+    sha256, size, uploaded_at = row
+    last_modified = upload_store.uploaded_time(uploaded_at)
+    # Blobs never change, so the content hash is a strong ETag and a
+    # revalidation is answered from the index without touching the file.
+    if not is_resource_modified(request.environ, etag=sha256, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        store = upload_store.get_store()
+        path = store.path(sha256)
+        if app.config['UPLOAD_ACCEL_REDIRECT']:
+            response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = (app.config['UPLOAD_ACCEL_REDIRECT'].rstrip('/') + '/'
+                                                    + os.path.relpath(path, store.root))
+        else:
+            # Handles Range and If-Range; under a server that provides
+            # wsgi.file_wrapper (gunicorn), whole files go out with sendfile().
+            response = send_file(path, download_name=filename, etag=sha256, last_modified=last_modified)
+    response.set_etag(sha256)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/redirect')
 def open_redirect():
@@ -277,23 +404,58 @@ def open_redirect():
 def redirect_demo():
     return render_template('redirect_demo.html')
 
+# Set SEARCH_VULNERABLE=1 to bring back the injectable LIKE query for the SQL
+# injection demo; by default /search uses the full-text index.
+app.config['SEARCH_VULNERABLE'] = os.environ.get('SEARCH_VULNERABLE', '0') == '1'
+SEARCH_RESULTS_PER_PAGE = 20
+MAX_SEARCH_QUERY = 100
+
+def search_users(c, query, page, per_page):
+    """Return one page of users matching query, best matches first."""
+    offset = (page - 1) * per_page
+    if len(query) < 3:
+        # Too short for the trigram index: match username prefixes instead,
+        # which is a range scan on the unique username index.
+        c.execute('''SELECT id, username, email FROM users WHERE username >= ? AND username < ?
+                     ORDER BY username LIMIT ? OFFSET ?''', (query, query + '\U0010ffff', per_page + 1, offset))
+    elif app.config.get('SEARCH_FTS'):
+        phrase = '"' + query.replace('"', '""') + '"'
+        c.execute('''SELECT users.id, users.username, users.email FROM users_fts
+                     JOIN users ON users.id = users_fts.rowid
+                     WHERE users_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?''', (phrase, per_page + 1, offset))
+    else:
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        c.execute('''SELECT id, username, email FROM users WHERE username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\'
+                     ORDER BY id LIMIT ? OFFSET ?''', (pattern, pattern, per_page + 1, offset))
+    return c.fetchall()
+
 @app.route('/search', methods=['GET', 'POST'])
+@search_limiter.limit(methods=('GET', 'POST'), on_limit=lambda message: render_template('search.html', results=[], query='', error=message, page=1, has_next=False))
 def search():
     results = []
     query = ''
-    if request.method == 'POST':
-        query = request.form['query']
-        conn = sqlite3.connect('users.db')
+    error = None
+    page = max(request.args.get('page', 1, type=int), 1)
+    has_next = False
+    if request.method == 'POST' or 'query' in request.args:
+        query = request.values['query']
+        conn = get_db()
         c = conn.cursor()
-        # Vulnerable SQL query (not parameterized)
-        sql = f"SELECT id, username, email FROM users WHERE username LIKE '%{query}%'"
-        try:
-            c.execute(sql)
-            results = c.fetchall()
-        except Exception as e:
-            results = [(str(e), '', '')]
-        conn.close()
-    return render_template('search.html', results=results, query=query)
+        if app.config['SEARCH_VULNERABLE']:
+            # Vulnerable SQL query (not parameterized)
+            sql = f"SELECT id, username, email FROM users WHERE username LIKE '%{query}%'"
+            try:
+                c.execute(sql)
+                results = c.fetchall()
+            except Exception as e:
+                results = [(str(e), '', '')]
+        elif not query.strip() or len(query) > MAX_SEARCH_QUERY:
+            error = f'Invalid query: enter 1-{MAX_SEARCH_QUERY} characters.'
+        else:
+            results = search_users(c, query.strip(), page, SEARCH_RESULTS_PER_PAGE)
+            has_next = len(results) > SEARCH_RESULTS_PER_PAGE
+            results = results[:SEARCH_RESULTS_PER_PAGE]
+    return render_template('search.html', results=results, query=query, error=error, page=page, has_next=has_next)
 
 @app.route('/change-password', methods=['GET', 'POST'])
 def change_password():
@@ -302,29 +464,54 @@ def change_password():
         user_id = request.form['user_id']
         new_password = request.form['new_password']
         try:
-            conn = sqlite3.connect('users.db')
+            hashed = passwords.get_hasher().hash(new_password)
+            conn = get_db()
             c = conn.cursor()
-            c.execute('UPDATE users SET password=? WHERE id=?', (new_password, user_id))
+            c.execute('UPDATE users SET password=? WHERE id=?', (hashed, user_id))
             conn.commit()
-            conn.close()
             message = f'Password for user id {user_id} changed!'
+        except passwords.Busy:
+            message = PASSWORDS_BUSY_MESSAGE
         except Exception as e:
             message = f'Error: {e}'
     return render_template('change_password.html', message=message)
 
-# Setup error logging
-logging.basicConfig(filename='error_demo.log', level=logging.ERROR, format='%(asctime)s %(levelname)s %(message)s')
+# Setup error logging (written from a background thread; see error_log.py)
+error_log.setup('error_demo.log')
+
+CRASH_BUSY_MESSAGE = 'Too many crash simulations in progress. Please try again shortly.'
+
+CRASH_SCENARIO_NAMES = {'memory': 'Memory exhaustion', 'loop': 'Infinite loop'}
 
-class TimeoutException(Exception): pass
+def crash_sandbox_response(scenario, result):
+    """The /crash response for a scenario run by crash_sandbox.
 
-def handler(signum, frame):
-    raise TimeoutException('Infinite loop timed out!')
+    An exception in the child is raised again here, so it is shown and
+    handled like the other crash types.
+    """
+    if result.outcome == 'exception':
+        logging.error(f"Crash demo error in the sandbox: {result.error}: {result.message}\n{result.traceback}")
+        crash_sandbox.reraise(result)
+    if result.outcome in ('cpu_limit', 'killed'):
+        logging.error(f"Crash demo timeout: {result.message}")
+        return f"{CRASH_SCENARIO_NAMES[scenario]} timed out after {result.seconds:.0f} seconds"
+    if result.outcome == 'failed':
+        logging.error(f"Crash demo failed: {result.message}")
+        return "Internal Server Error", 500
+    return result.output
 
 @app.route('/crash', methods=['GET', 'POST'])
 def crash():
     error_type = request.args.get('type')
     if request.method == 'POST':
         error_type = request.form.get('type')
+    if error_type in crash_sandbox.SCENARIOS:
+        # memory and loop run in a child process with memory and CPU limits.
+        try:
+            result = crash_sandbox.get_sandbox().run(error_type)
+        except crash_sandbox.Busy:
+            return CRASH_BUSY_MESSAGE, 503
+        return crash_sandbox_response(error_type, result)
     try:
         if error_type == 'zero':
             return 1 / 0
@@ -346,24 +533,8 @@ def crash():
             import time
             time.sleep(5)
             return "Simulated slow response (5 seconds)"
-        elif error_type == 'memory':
-            a = []
-            for _ in range(10**8):
-                a.append('x' * 1000)
-            return "Should have triggered MemoryError"
         elif error_type == 'os':
             open('/file/does/not/exist.txt')
-        elif error_type == 'loop':
-            signal.signal(signal.SIGALRM, handler)
-            signal.alarm(3)  # 3 second timeout
-            try:
-                while True:
-                    pass
-            except TimeoutException as te:
-                logging.error(f"Crash demo timeout: {repr(te)}", exc_info=True)
-                return "Infinite loop timed out after 3 seconds"
-            finally:
-                signal.alarm(0)
     except Exception as e:
         logging.error(f"Crash demo error: {repr(e)}", exc_info=True)
         raise
@@ -387,29 +558,51 @@ def weak_dashboard():
     session_id = request.args.get('session_id') or request.cookies.get('session_id')
     return render_template('weak_dashboard.html', session_id=session_id)
 
+# Set PING_VULNERABLE=1 to bring back the shell command for the command
+# injection demo; by default /ping runs a validated host on the ping runner.
+app.config['PING_VULNERABLE'] = os.environ.get('PING_VULNERABLE', '0') == '1'
+
+PING_INVALID_MESSAGE = 'Invalid host: enter an IP address or hostname.'
+PING_BUSY_MESSAGE = 'Too many pings in progress. Please try again shortly.'
+
+def ping_limited_page(message):
+    return render_template('ping.html', output=message, host='')
+
 @app.route('/ping', methods=['GET', 'POST'])
+@ping_limiter.limit(on_limit=ping_limited_page)
 def ping():
     output = None
+    error = None
     host = ''
+    status = 200
     if request.method == 'POST':
-        host = request.form['host']
-        # Vulnerable to command injection
-        cmd = f'ping -c 1 {host}'
-        output = os.popen(cmd).read()
-    return render_template('ping.html', output=output, host=host)
+        host = request.form.get('host', '')
+        if app.config['PING_VULNERABLE']:
+            # Vulnerable to command injection
+            cmd = f'ping -c 1 {host}'
+            output = os.popen(cmd).read()
+        else:
+            try:
+                output = ping_runner.get_runner().ping(host)
+            except ping_runner.InvalidHost:
+                error = PING_INVALID_MESSAGE
+            except ping_runner.Busy:
+                error = PING_BUSY_MESSAGE
+                status = 503
+    return render_template('ping.html', output=output, error=error, host=host), status
 
 @app.route('/brute-login', methods=['GET', 'POST'])
+@brute_login_limiter.limit(message=LOGIN_LIMIT_MESSAGE, on_limit=lambda message: render_template('brute_login.html', message=message))
 def brute_login():
     message = None
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        conn = sqlite3.connect('users.db')
+        conn = get_db()
         c = conn.cursor()
         query = f"SELECT * FROM users WHERE username='{username}' AND password='{password}'"
         c.execute(query)
         user = c.fetchone()
-        conn.close()
         if user:
             message = f"Welcome {user[1]}! (Brute-force demo)"
         else:
@@ -421,6 +614,17 @@ def brute_login():
 def dashboard():
     return render_template('dashboard.html')
 
-if __name__ == '__main__':
+def create_app(config=None):
+    """Apply config, create or migrate the database and return the app.
+
+    The entry point for WSGI servers, e.g. serve.py or
+    ``gunicorn --preload -w 4 --threads 8 'app:create_app()'``. Call it once,
+    before forking any workers, so the database is set up only once.
+    """
+    if config:
+        app.config.update(config)
     init_db()
-    app.run(debug=True) 
\ No newline at end of file
+    return app
+
+if __name__ == '__main__':
+    create_app().run(debug=True) 
\ No newline at end of file
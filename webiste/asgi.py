@@ -0,0 +1,313 @@
+"""ASGI entry point, with the routes that wait implemented as coroutines.
+
+Under a WSGI server every request holds a thread until it returns. /ping (a
+subprocess), /crash?type=slow (five seconds of sleep) and /crash?type=memory
+and ?type=loop (a child process in the crash sandbox) spend nearly all of
+that time waiting, so a few of them in flight take every thread serve.py has
+and fast requests queue behind them. Here those routes are coroutines on the
+event loop:
+
+* /ping runs on ping_runner.AsyncPingRunner, which gives asyncio
+  subprocesses the same host checks, limits and cache as the WSGI route.
+  The rate limit is the same too, counted on a worker thread since the
+  shared backend blocks,
+* /crash?type=slow is ``asyncio.sleep(5)``, and
+* /crash?type=memory and ?type=loop wait for the crash sandbox's child
+  process with ``CrashSandbox.run_async``.
+
+While they wait, the loop goes on serving other requests. Every other route,
+and the other /crash types, go to the Flask app unchanged. It runs on a pool
+of ASGI_THREADS threads, and request and response bodies are streamed between
+the loop and the thread in chunks.
+
+Run it under any ASGI server. uvicorn is not a dependency of the demo
+(pip3 install uvicorn):
+
+    uvicorn asgi:app --port 5000
+
+With PING_VULNERABLE=1, /ping runs the shell command for the command
+injection demo, as an asyncio subprocess.
+"""
+import asyncio
+import io
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, render_template, request
+
+import crash_sandbox
+import ping_runner
+from app import (CRASH_BUSY_MESSAGE, PING_BUSY_MESSAGE, PING_INVALID_MESSAGE, crash_sandbox_response, create_app,
+                 ping_limited_page, ping_limiter)
+
+DEFAULT_THREADS = 32
+# The forms posted to the coroutine routes are tiny; anything bigger is
+# turned away rather than buffered.
+MAX_FORM_BODY = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+SLOW_SECONDS = 5
+
+
+async def ping():
+    if request.method != 'POST':
+        return None
+    # With RATE_LIMIT_DATABASE set a hit is SQLite and file-lock I/O, which
+    # must not block the loop. to_thread() carries the request context along.
+    if not await asyncio.to_thread(ping_limiter.hit, request.remote_addr):
+        return ping_limiter.limited_response(on_limit=ping_limited_page)
+    host = request.form.get('host', '')
+    output = None
+    error = None
+    status = 200
+    if current_app.config['PING_VULNERABLE']:
+        # Vulnerable to command injection
+        proc = await asyncio.create_subprocess_shell(f'ping -c 1 {host}', stdout=subprocess.PIPE)
+        output = (await proc.stdout.read()).decode('utf-8', 'replace')
+        await proc.wait()
+    else:
+        try:
+            output = await ping_runner.get_async_runner().ping(host)
+        except ping_runner.InvalidHost:
+            error = PING_INVALID_MESSAGE
+        except ping_runner.Busy:
+            error = PING_BUSY_MESSAGE
+            status = 503
+    return render_template('ping.html', output=output, error=error, host=host), status
+
+
+async def crash():
+    error_type = request.form.get('type') if request.method == 'POST' else request.args.get('type')
+    if error_type == 'slow':
+        await asyncio.sleep(SLOW_SECONDS)
+        return 'Simulated slow response (5 seconds)'
+    if error_type in crash_sandbox.SCENARIOS:
+        try:
+            result = await crash_sandbox.get_sandbox().run_async(error_type)
+        except crash_sandbox.Busy:
+            return CRASH_BUSY_MESSAGE, 503
+        return crash_sandbox_response(error_type, result)
+    return None
+
+
+class ASGIApp:
+    """Serve a Flask app over ASGI.
+
+    ``routes`` maps paths to coroutine views that run in a Flask request
+    context and return what a Flask view would, or None to leave the request
+    to the Flask app. Every other request goes to the Flask app on a pool of
+    ``threads`` threads.
+    """
+
+    def __init__(self, wsgi_app, routes, threads=DEFAULT_THREADS):
+        self.wsgi_app = wsgi_app
+        self.routes = routes
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            await send({'type': 'websocket.close'})
+            return
+        view = self.routes.get(_path_info(scope))
+        if view is None:
+            body = io.BufferedReader(_RequestBody(asyncio.get_running_loop(), receive), CHUNK_SIZE)
+        else:
+            data = await _read_body(receive, MAX_FORM_BODY)
+            if data is None:
+                await _send_response(send, self.wsgi_app.response_class('Request body too large', 413))
+                return
+            response = await self._dispatch(view, _environ(scope, io.BytesIO(data)))
+            if response is not None:
+                await _send_response(send, response, head=scope['method'] == 'HEAD')
+                return
+            body = io.BytesIO(data)
+        await self._call_wsgi(_environ(scope, body), send)
+
+    async def _dispatch(self, view, environ):
+        # The same steps as Flask.wsgi_app, with the view awaited. Each ASGI
+        # request runs in its own task, so the request context stays with it
+        # across awaits.
+        app = self.wsgi_app
+        ctx = app.request_context(environ)
+        error = None
+        ctx.push()
+        try:
+            try:
+                rv = await view()
+                if rv is None:
+                    return None
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            return app.handle_exception(e)
+        finally:
+            ctx.pop(error)
+
+    async def _call_wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        def start():
+            iterable = self.wsgi_app(environ, start_response)
+            chunks = iter(iterable)
+            try:
+                # start_response may be deferred until the first chunk.
+                data, done = _next_chunks(chunks)
+            except BaseException:
+                _close(iterable)
+                raise
+            if done:
+                _close(iterable)
+            return iterable, chunks, data, done
+
+        iterable, chunks, data, done = await loop.run_in_executor(self._executor, start)
+        closed = done
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                    for name, value in started['headers']]})
+            while not done:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+                data, done = await loop.run_in_executor(self._executor, _next_chunks, chunks)
+            await send({'type': 'http.response.body', 'body': data})
+        finally:
+            if not closed:
+                await loop.run_in_executor(self._executor, _close, iterable)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input for a body that is still arriving on the event loop.
+
+    Read from a pool thread; each read that needs more data waits for the
+    next ASGI message.
+    """
+
+    def __init__(self, loop, receive):
+        self._loop = loop
+        self._receive = receive
+        self._buffer = b''
+        self._offset = 0
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._offset == len(self._buffer) and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._more = False
+            else:
+                self._buffer = message.get('body', b'')
+                self._offset = 0
+                self._more = message.get('more_body', False)
+        n = min(len(b), len(self._buffer) - self._offset)
+        b[:n] = self._buffer[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+
+async def _read_body(receive, limit):
+    """Return the whole request body, or None if it is over limit bytes."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if len(body) > limit:
+            return None
+        if not message.get('more_body', False):
+            break
+    return bytes(body)
+
+
+def _path_info(scope):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': _path_info(scope).encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            environ[key] += ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        else:
+            environ[key] = value
+    return environ
+
+
+def _next_chunks(chunks):
+    """Join chunks up to CHUNK_SIZE bytes; return (data, exhausted)."""
+    data = bytearray()
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= CHUNK_SIZE:
+            return bytes(data), False
+    return bytes(data), True
+
+
+def _close(iterable):
+    if hasattr(iterable, 'close'):
+        iterable.close()
+
+
+async def _send_response(send, response, head=False):
+    await send({'type': 'http.response.start', 'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.to_wsgi_list()]})
+    await send({'type': 'http.response.body', 'body': b'' if head else response.get_data()})
+    response.close()
+
+
+flask_app = create_app()
+app = ASGIApp(flask_app, {'/ping': ping, '/crash': crash},
+              flask_app.config.setdefault('ASGI_THREADS', DEFAULT_THREADS))
@@ -0,0 +1,136 @@
+"""Fast requests served while slow ones wait, under WSGI and under ASGI.
+
+Each server is started in a scratch directory: serve.py with one worker of
+``--threads`` threads, then ``uvicorn asgi:app`` (skipped if uvicorn is not
+installed). ``--slow`` requests to /crash?type=slow (five seconds each) are
+sent at once. While they are in flight, ``--concurrency`` client threads keep
+sending GETs to /dashboard until the last slow request is answered. Reported
+are how long the slow requests took to finish, how many fast requests were
+answered within the first five seconds (while the first slow requests are
+still sleeping), and the median and worst fast request latency.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_async_routes.py
+    python3 benchmarks/bench_async_routes.py --slow 200 --concurrency 32
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SLOW_SECONDS = 5
+WEBISTE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/dashboard')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def get(port, path, timeout=120):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.status == 200, resp.status
+    finally:
+        conn.close()
+
+
+def run(port, slow, concurrency):
+    slow_done = threading.Event()
+    remaining = [slow]
+    lock = threading.Lock()
+    # (finished at, latency) of every fast request
+    fast = []
+
+    def slow_client():
+        get(port, '/crash?type=slow')
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                slow_done.set()
+
+    def fast_client():
+        mine = []
+        while not slow_done.is_set():
+            sent = time.perf_counter()
+            get(port, '/dashboard')
+            now = time.perf_counter()
+            mine.append((now, now - sent))
+        with lock:
+            fast.extend(mine)
+
+    slow_threads = [threading.Thread(target=slow_client) for _ in range(slow)]
+    start = time.perf_counter()
+    for t in slow_threads:
+        t.start()
+    time.sleep(0.2)  # let the slow requests reach the server first
+    fast_threads = [threading.Thread(target=fast_client) for _ in range(concurrency)]
+    for t in fast_threads:
+        t.start()
+    for t in slow_threads + fast_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    early = sum(1 for finished, _ in fast if finished - start < SLOW_SECONDS)
+    latencies = [latency for _, latency in fast]
+    return elapsed, early, statistics.median(latencies) * 1000, max(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slow', type=int, default=50, help='concurrent /crash?type=slow requests')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads sending fast requests')
+    parser.add_argument('--threads', type=int, default=8, help='request threads of the WSGI worker')
+    args = parser.parse_args()
+
+    modes = [(f'serve.py 1x{args.threads}', [sys.executable, os.path.join(WEBISTE, 'serve.py'),
+                                            '--workers', '1', '--threads', str(args.threads), '--port'])]
+    if importlib.util.find_spec('uvicorn'):
+        modes.append(('uvicorn asgi:app', [sys.executable, '-m', 'uvicorn', '--app-dir', WEBISTE, 'asgi:app',
+                                           '--log-level', 'warning', '--port']))
+    else:
+        print('uvicorn is not installed; only the WSGI server is measured (pip3 install uvicorn)')
+
+    print(f'{args.slow} slow requests in flight, {args.concurrency} fast clients')
+    print(f"{'Server':<18} {'Slow done':>10} {'Fast in 5s':>11} {'Median':>10} {'Worst':>11}")
+    for name, command in modes:
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            server = subprocess.Popen(command + [str(port)], cwd=tmp, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL, start_new_session=True)
+            try:
+                wait_ready(port)
+                elapsed, early, median, worst = run(port, args.slow, args.concurrency)
+                print(f'{name:<18} {elapsed:>9.1f}s {early:>11} {median:>7.1f} ms {worst:>8.1f} ms')
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Server memory and latency while /crash memory and loop scenarios run.
+
+serve.py is started with one worker of ``--threads`` threads in a scratch
+directory, with the app's own /crash plus a scratch /bench-crash-inline route
+that runs the same two scenarios inside the worker, as /crash used to: the
+list of 10**8 strings, and a three-second spin (the SIGALRM timeout cannot be
+set outside the main thread, so it is checked in the loop instead). For each
+route ``--crashes`` requests of each type are sent at once. While they are in
+flight, ``--concurrency`` client threads keep sending GETs to /dashboard.
+Reported are how long the crash requests took, their status codes, the
+worker's peak resident memory (sandbox children are separate processes and
+not counted), and the /dashboard throughput and median and worst latency.
+The sandbox runs CRASH_SANDBOX_WORKERS (2) children at once and answers any
+more with 503.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_crash_sandbox.py
+    python3 benchmarks/bench_crash_sandbox.py --crashes 2 --concurrency 16
+"""
+import argparse
+import collections
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+WEBISTE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = '''
+import sys, time
+sys.path.insert(0, sys.argv[2])
+import serve
+from app import create_app
+from flask import request
+
+app = create_app()
+
+@app.route('/bench-crash-inline', methods=['POST'])
+def bench_crash_inline():
+    if request.form['type'] == 'memory':
+        a = []
+        for _ in range(10**8):
+            a.append('x' * 1000)
+        return 'Should have triggered MemoryError'
+    deadline = time.monotonic() + 3
+    while time.monotonic() < deadline:
+        pass
+    return 'Infinite loop timed out after 3 seconds'
+
+serve.run(app, port=int(sys.argv[1]), workers=1, threads=int(sys.argv[3]))
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/dashboard')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def request(port, method, path, body=None, timeout=120):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+        conn.request(method, path, body, headers)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker_pid(parent):
+    with open(f'/proc/{parent}/task/{parent}/children') as f:
+        return int(f.read().split()[0])
+
+
+def run(port, worker, path, crashes, concurrency):
+    done = threading.Event()
+    statuses = collections.Counter()
+    latencies = []
+    lock = threading.Lock()
+    peak = [rss_mb(worker)]
+
+    def crash_client(kind):
+        status = request(port, 'POST', path, f'type={kind}')
+        with lock:
+            statuses[status] += 1
+
+    def fast_client():
+        mine = []
+        while not done.is_set():
+            sent = time.perf_counter()
+            assert request(port, 'GET', '/dashboard') == 200
+            mine.append(time.perf_counter() - sent)
+        with lock:
+            latencies.extend(mine)
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_mb(worker))
+            time.sleep(0.05)
+
+    crash_threads = [threading.Thread(target=crash_client, args=(kind,))
+                     for kind in ('memory', 'loop') for _ in range(crashes)]
+    others = [threading.Thread(target=sample)] + [threading.Thread(target=fast_client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in crash_threads + others:
+        t.start()
+    for t in crash_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in others:
+        t.join()
+    return (elapsed, statuses, peak[0], len(latencies) / elapsed, statistics.median(latencies) * 1000,
+            max(latencies) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--crashes', type=int, default=1, help='concurrent requests of each crash type')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads sending fast requests')
+    parser.add_argument('--threads', type=int, default=16, help='request threads of the worker')
+    args = parser.parse_args()
+
+    print(f'{args.crashes} memory + {args.crashes} loop requests at once, {args.concurrency} fast clients')
+    print(f"{'Route':<20} {'Crashes done':>12} {'Statuses':<12} {'Peak RSS':>9} {'Fast':>9} {'Median':>9} {'Worst':>10}")
+    for name, path in (('inline (before)', '/bench-crash-inline'), ('sandbox (/crash)', '/crash')):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            server = subprocess.Popen([sys.executable, '-c', SERVER, str(port), WEBISTE, str(args.threads)], cwd=tmp,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+            try:
+                wait_ready(port)
+                elapsed, statuses, peak, fast, median, worst = run(port, worker_pid(server.pid), path,
+                                                                   args.crashes, args.concurrency)
+                codes = ' '.join(f'{n}x{code}' for code, n in sorted(statuses.items()))
+                print(f'{name:<20} {elapsed:>11.1f}s {codes:<12} {peak:>6.0f} MB {fast:>5.0f} r/s {median:>6.1f} ms '
+                      f'{worst:>7.1f} ms')
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Requests per second on /users and /login with and without the connection pool.
+
+Runs the app in-process through Flask's test client against a scratch copy of
+the database, so the numbers show server-side cost only (no network, no
+dev-server threads). Each endpoint is measured with DB_POOL_SIZE=0 (a new
+connection per request, as the app used to do) and with the pool enabled.
+Passwords are hashed at ``--work-factor`` (default 7, the lowest werkzeug's
+scrypt accepts) rather than the app's default of 15, which would spend most of
+each /login request in scrypt.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_db_pool.py
+    python3 benchmarks/bench_db_pool.py --requests 5000 --threads 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from app import app, init_db  # noqa: E402
+
+
+def users_request(client, i):
+    return client.get('/users')
+
+
+def login_request(client, i):
+    # A different client address per request keeps the per-IP login limiter
+    # from answering before the database is queried.
+    addr = f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+    return client.post('/login', data={'username': 'alice', 'password': 'wrongpass'},
+                       environ_overrides={'REMOTE_ADDR': addr})
+
+
+def run(send, requests, threads):
+    per_thread = requests // threads
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(offset, offset + per_thread):
+            resp = send(client, i)
+            assert resp.status_code == 200, resp.status_code
+
+    workers = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--pool-size', type=int, default=db.DEFAULT_POOL_SIZE)
+    parser.add_argument('--work-factor', type=int, default=7, help='PASSWORD_WORK_FACTOR for the run')
+    args = parser.parse_args()
+
+    app.config['PASSWORD_WORK_FACTOR'] = args.work_factor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'bench.db')
+        init_db()
+        print(f"{'Endpoint':<10} {'No pool':>12} {'Pool':>12} {'Speed-up':>9}")
+        for path, send in (('/users', users_request), ('/login', login_request)):
+            rates = []
+            for size in (0, args.pool_size):
+                db.reset_pool(app)
+                app.config['DB_POOL_SIZE'] = size
+                run(send, min(200, args.requests), args.threads)  # warm up
+                rates.append(run(send, args.requests, args.threads))
+            print(f'{path:<10} {rates[0]:>8.0f} r/s {rates[1]:>8.0f} r/s {rates[1] / rates[0]:>8.2f}x')
+        db.reset_pool(app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Request latency and log volume while the same errors are logged over and over.
+
+``--concurrency`` threads send ``--requests`` POSTs between them to /crash
+through Flask's test client, cycling through type=zero, key, type and custom
+as the crash suite does. Each request logs its exception twice (the view's
+``logging.error(..., exc_info=True)`` and Flask's own "Exception on /crash").
+This is run with the old setup (``logging.basicConfig`` with a FileHandler,
+written from the request thread) and with error_log.setup()'s queue, rotation
+and deduplication. Reported are requests per second, the median and p99
+request latency, the time the writer thread needed to catch up after the
+last request, and the size of the log files.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_error_logging.py
+    python3 benchmarks/bench_error_logging.py --requests 20000 --concurrency 16
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import error_log  # noqa: E402
+from app import app, init_db  # noqa: E402
+
+TYPES = ('zero', 'key', 'type', 'custom')
+
+
+def load(requests, concurrency):
+    per_thread = requests // concurrency
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        client = app.test_client()
+        mine = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            resp = client.post('/crash', data={'type': TYPES[(offset + i) % len(TYPES)]})
+            assert resp.status_code == 500, resp.status_code
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (len(latencies) / elapsed, statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.99) - 1] * 1000)
+
+
+def log_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config.update(DATABASE=os.path.join(tmp, 'bench.db'))
+        init_db()
+        print(f'{args.requests} crash requests, {args.concurrency} threads')
+        print(f"{'Logging':<22} {'Throughput':>11} {'Median':>9} {'p99':>9} {'Catch-up':>9} {'Log size':>10}")
+        for name in ('basicConfig (before)', 'error_log.setup()'):
+            logs = os.path.join(tmp, name.split()[0])
+            os.mkdir(logs)
+            filename = os.path.join(logs, 'error_demo.log')
+            if name.startswith('basicConfig'):
+                logging.basicConfig(filename=filename, level=logging.ERROR,
+                                    format='%(asctime)s %(levelname)s %(message)s')
+                stop = root.handlers[0].close
+            else:
+                stop = error_log.setup(filename).close
+            load(min(200, args.requests), args.concurrency)  # warm up
+            rate, median, p99 = load(args.requests, args.concurrency)
+            start = time.perf_counter()
+            stop()
+            catch_up = (time.perf_counter() - start) * 1000
+            root.removeHandler(root.handlers[0])
+            print(f'{name:<22} {rate:>7.0f} r/s {median:>6.2f} ms {p99:>6.2f} ms {catch_up:>6.1f} ms '
+                  f'{log_size(logs) / 1024:>7.0f} KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Login throughput at each password work factor.
+
+A user's password is hashed at each scrypt work factor in a scratch database, then
+``--threads`` test clients post ``--requests`` logins to /login between them:
+once with a wrong password (never cached, so every login pays for a hash,
+as a brute-force run does) and once with the right one (answered from the
+verified cache after the first). The old check (one unsalted SHA-256 in SQL,
+registered on a scratch route for the run) is measured the same way.
+
+hashlib.scrypt releases the GIL, so wrong-password throughput grows with the
+number of cores up to PASSWORD_WORKERS.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_password_hashing.py
+    python3 benchmarks/bench_password_hashing.py --factors 14 15 16 --threads 8
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import passwords  # noqa: E402
+from app import app, init_db  # noqa: E402
+from db import get_db  # noqa: E402
+from flask import request  # noqa: E402
+
+
+@app.route('/bench-login-old', methods=['POST'])
+def old_login():
+    hashed = hashlib.sha256(request.form['password'].encode()).hexdigest()
+    user = get_db().execute('SELECT id FROM users WHERE username=? AND password=?',
+                            (request.form['username'], hashed)).fetchone()
+    return 'Welcome' if user else 'Invalid credentials'
+
+
+# Client addresses are never reused, across runs too, so the login limiter
+# (5 per address per minute) never answers first.
+_addresses = itertools.count()
+
+
+def logins_per_second(path, password, requests, threads):
+    per_thread = requests // threads
+    expected = b'Invalid' if password == 'wrongpass' else b'Welcome'
+
+    def worker():
+        client = app.test_client()
+        for _ in range(per_thread):
+            i = next(_addresses)
+            addr = f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+            resp = client.post(path, data={'username': 'benchuser', 'password': password},
+                               environ_overrides={'REMOTE_ADDR': addr})
+            assert resp.status_code == 200 and expected in resp.data, resp.status_code
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[12, 13, 14, 15, 16])
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config.update(DATABASE=os.path.join(tmp, 'bench.db'), UPLOAD_FOLDER=tmp,
+                          UPLOAD_STORE=os.path.join(tmp, '.store'),
+                          PASSWORD_QUEUE=args.threads, PASSWORD_WORKERS=os.cpu_count() or 1)
+        init_db()
+        conn = db.connect(app.config['DATABASE'])
+        print(f'{args.threads} client threads, {app.config["PASSWORD_WORKERS"]} hashing workers')
+        print(f"{'Hash':<18} {'ms/hash':>8} {'wrong password':>15} {'right password':>15}")
+        conn.execute("INSERT INTO users (username, password, email, role) VALUES ('benchuser', ?, 'b@example.com', 'user')",
+                     (hashlib.sha256(b'benchpass').hexdigest(),))
+        conn.commit()
+        wrong = logins_per_second('/bench-login-old', 'wrongpass', args.requests * 10, args.threads)
+        right = logins_per_second('/bench-login-old', 'benchpass', args.requests * 10, args.threads)
+        print(f"{'sha256 (old)':<18} {'-':>8} {wrong:>11.0f} /s {right:>11.0f} /s")
+        for factor in args.factors:
+            app.config['PASSWORD_WORK_FACTOR'] = factor
+            hasher = passwords.get_hasher(app)
+            start = time.perf_counter()
+            stored = hasher.hash('benchpass')
+            per_hash = (time.perf_counter() - start) * 1000
+            conn.execute("UPDATE users SET password=? WHERE username='benchuser'", (stored,))
+            conn.commit()
+            wrong = logins_per_second('/login', 'wrongpass', args.requests, args.threads)
+            right = logins_per_second('/login', 'benchpass', args.requests * 10, args.threads)
+            print(f'{hasher.method:<18} {per_hash:>8.1f} {wrong:>11.1f} /s {right:>11.0f} /s')
+        conn.close()
+        db.reset_pool(app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Latency of other routes while /ping is flooded with slow pings.
+
+A fixed pool of ``--threads`` threads stands in for the server's request
+threads. A burst of /ping requests for distinct unreachable hosts is queued,
+immediately followed by a stream of /users requests, and the time each /users
+request takes from being queued to being answered is reported. This is run
+once with the old shell command (PING_VULNERABLE) and once with the ping
+runner.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_ping.py
+    python3 benchmarks/bench_ping.py --threads 16 --burst 40 --host-prefix 10.255.255.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db  # noqa: E402
+
+local = threading.local()
+
+
+def client():
+    if not hasattr(local, 'client'):
+        local.client = app.test_client()
+    return local.client
+
+
+def send_ping(host, addr):
+    # One client address per request so the /ping limiter does not answer first.
+    return client().post('/ping', data={'host': host}, environ_overrides={'REMOTE_ADDR': addr}).status_code
+
+
+def send_users(queued):
+    status = client().get('/users').status_code
+    return status, time.perf_counter() - queued
+
+
+def flood(threads, burst, host_prefix, requests):
+    with ThreadPoolExecutor(threads) as server:
+        pings = [server.submit(send_ping, f'{host_prefix}{i + 1}', f'10.1.{i >> 8}.{i & 255}') for i in range(burst)]
+        users = []
+        for _ in range(requests):
+            users.append(server.submit(send_users, time.perf_counter()))
+            time.sleep(0.01)
+        latencies = [f.result()[1] for f in users]
+        statuses = Counter(f.result() for f in pings)
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--burst', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--host-prefix', default='10.255.255.', help='pinged hosts are <prefix>1, <prefix>2, ...')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'bench.db')
+        init_db()
+        print(f'{args.threads} request threads, {args.burst} pings then {args.requests} /users requests')
+        print(f"{'/ping':<18} {'users median':>13} {'users max':>10} {'ping statuses':>16}")
+        for name, vulnerable in (('shell (old)', True), ('ping runner', False)):
+            app.config['PING_VULNERABLE'] = vulnerable
+            app.extensions.pop('ping_runner', None)
+            latencies, statuses = flood(args.threads, args.burst, args.host_prefix, args.requests)
+            codes = ' '.join(f'{code}x{count}' for code, count in sorted(statuses.items()))
+            print(f'{name:<18} {statistics.median(latencies) * 1000:>10.1f} ms '
+                  f'{max(latencies) * 1000:>7.1f} ms {codes:>16}')
+            runner = app.extensions.pop('ping_runner', None)
+            if runner is not None:
+                runner.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Memory and time per hit of the rate limiter with 1M distinct client keys.
+
+Compares the old login limiter (a dict of timestamp lists that never forgets
+an address) with RateLimiter, once with room for every key and once with the
+default key cap. Memory is measured with tracemalloc after all keys have been
+seen.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_rate_limit.py
+    python3 benchmarks/bench_rate_limit.py --keys 200000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import DEFAULT_MAX_KEYS, MemoryBackend, RateLimiter  # noqa: E402
+
+
+class ListLimiter:
+    """The limiter app.py used before: a list of attempt times per address."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.attempts = {}
+
+    def hit(self, key):
+        now = time.time()
+        attempts = [t for t in self.attempts.get(key, []) if now - t < self.window]
+        if len(attempts) >= self.limit:
+            return False
+        attempts.append(now)
+        self.attempts[key] = attempts
+        return True
+
+
+def measure(limiter, keys):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for key in keys:
+        limiter.hit(key)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 2**20, peak / 2**20, elapsed / len(keys) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keys', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    keys = [f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}' for i in range(args.keys)]
+    limiters = [
+        ('dict of timestamp lists (old)', ListLimiter(5, 60)),
+        ('RateLimiter, no key cap', RateLimiter('bench', 5, 60, backend=MemoryBackend(max_keys=args.keys))),
+        (f'RateLimiter, max_keys={DEFAULT_MAX_KEYS:,}', RateLimiter('bench', 5, 60, backend=MemoryBackend())),
+    ]
+    print(f'{args.keys:,} distinct keys, one hit each')
+    print(f"{'Limiter':<36} {'Retained':>10} {'Peak':>10} {'Per hit':>9}")
+    for name, limiter in limiters:
+        current, peak, per_hit = measure(limiter, keys)
+        print(f'{name:<36} {current:>7.1f} MB {peak:>7.1f} MB {per_hit:>6.2f} us')
+        del limiter
+
+
+if __name__ == '__main__':
+    main()
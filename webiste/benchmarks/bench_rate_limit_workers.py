@@ -0,0 +1,85 @@
+"""Rate limiting across worker processes: correctness and cost per hit.
+
+Several processes stand in for gunicorn workers. First they all hammer one
+client key of a limiter allowing 5 hits per minute, and the hits let through
+are totalled: with MemoryBackend every worker counts on its own, with
+SQLiteBackend the workers share one count. Then each worker sends hits for
+many distinct keys, pausing ``--interval`` milliseconds between hits as a
+worker busy with the rest of a request would, and the per-hit latency is
+reported.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_rate_limit_workers.py
+    python3 benchmarks/bench_rate_limit_workers.py --workers 8 --hits 20000 --interval 0
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import MemoryBackend, RateLimiter, SQLiteBackend  # noqa: E402
+
+LIMIT = 5
+
+
+def make_backend(path):
+    return SQLiteBackend(path) if path else MemoryBackend()
+
+
+def hammer(path, hits, start):
+    limiter = RateLimiter('bench', LIMIT, 60, backend=make_backend(path))
+    start.wait()
+    return sum(limiter.hit('10.0.0.1') for _ in range(hits))
+
+
+def latencies(path, hits, interval, start, offset):
+    limiter = RateLimiter('bench', LIMIT, 60, backend=make_backend(path))
+    keys = [f'10.{offset}.{(i >> 8) & 255}.{i & 255}' for i in range(hits)]
+    timings = []
+    start.wait()
+    for key in keys:
+        t = time.perf_counter()
+        limiter.hit(key)
+        timings.append(time.perf_counter() - t)
+        time.sleep(interval)
+    return timings
+
+
+def run(workers, target, *args):
+    with multiprocessing.Manager() as manager:
+        start = manager.Barrier(workers)
+        with multiprocessing.Pool(workers) as pool:
+            jobs = [pool.apply_async(target, args + (start,) + ((n,) if target is latencies else ()))
+                    for n in range(workers)]
+            return [job.get() for job in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hits', type=int, default=5000)
+    parser.add_argument('--interval', type=float, default=0.5, help='milliseconds between hits')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [('MemoryBackend', ''), ('SQLiteBackend', os.path.join(tmp, 'ratelimit.db'))]
+        print(f'{args.workers} workers, limit {LIMIT} per 60s')
+        print(f"{'Backend':<15} {'Allowed':>8} {'Median':>10} {'p99':>10} {'Mean':>10}")
+        for name, path in backends:
+            if path:
+                SQLiteBackend(path).close()  # create the table before the workers race for it
+            allowed = sum(run(args.workers, hammer, path, 50))
+            runs = run(args.workers, latencies, path, args.hits, args.interval / 1000)
+            timings = sorted(t for ts in runs for t in ts)
+            median, p99 = (timings[int(len(timings) * q)] * 1e6 for q in (0.5, 0.99))
+            mean = statistics.fmean(timings) * 1e6
+            print(f'{name:<15} {allowed:>8} {median:>7.1f} us {p99:>7.1f} us {mean:>7.1f} us')
+
+
+if __name__ == '__main__':
+    main()
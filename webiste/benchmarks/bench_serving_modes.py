@@ -0,0 +1,118 @@
+"""Throughput of Flask's debug server against serve.py's pre-forked workers.
+
+Each mode is started as its own server (``serve.py --debug``, which is what
+``python3 app.py`` runs, then ``serve.py`` with ``--workers`` and
+``--threads``) in a scratch directory, so it gets a fresh users.db. For each
+mode the time until the first response is reported, then
+``--concurrency`` client threads send ``--requests`` GETs to /dashboard and
+to /users over keep-alive connections. Requests per second and the median
+and p99 latency are reported.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_serving_modes.py
+    python3 benchmarks/bench_serving_modes.py --workers 4 --threads 8 --concurrency 32
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SERVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'serve.py')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/dashboard')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def load(port, path, requests, concurrency):
+    per_thread = requests // concurrency
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                # The server closed an idle keep-alive connection; retry once.
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+            assert resp.status == 200, resp.status
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (len(latencies) / elapsed, statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.99) - 1] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    modes = (('debug (app.py)', ['--debug']),
+             (f'serve.py {args.workers}x{args.threads}', ['--workers', str(args.workers), '--threads', str(args.threads)]))
+    print(f'{args.requests} requests per endpoint, {args.concurrency} concurrent clients')
+    print(f"{'Mode':<18} {'Startup':>8} {'Endpoint':<11} {'Throughput':>11} {'Median':>9} {'p99':>9}")
+    for name, extra in modes:
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            server = subprocess.Popen([sys.executable, SERVE, '--port', str(port)] + extra, cwd=tmp,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+            try:
+                startup = wait_ready(port)
+                for path in ('/dashboard', '/users'):
+                    load(port, path, min(200, args.requests), args.concurrency)  # warm up
+                    rate, median, p99 = load(port, path, args.requests, args.concurrency)
+                    print(f'{name:<18} {startup:>7.2f}s {path:<11} {rate:>7.0f} r/s {median:>6.1f} ms {p99:>6.1f} ms')
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Peak memory and time per /upload request as the file grows.
+
+Each request body is built before measuring starts and sent through Flask's
+test client, so the figures cover the server side only: Python heap peak
+(tracemalloc) while the request is handled, and wall time. The streaming
+/upload is compared with the old handler (request.files and file.save()),
+which is registered on a scratch route for the run.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_upload.py
+    python3 benchmarks/bench_upload.py --sizes 1 16 256
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db  # noqa: E402
+from flask import request  # noqa: E402
+
+
+@app.route('/bench-upload-old', methods=['POST'])
+def old_upload():
+    file = request.files['file']
+    file.save(os.path.join(app.config['UPLOAD_FOLDER'], file.filename))
+    return 'ok'
+
+
+def measure(client, path, size):
+    builder = EnvironBuilder(path=path, method='POST',
+                             data={'file': (io.BytesIO(b'a' * size), f'bench-{size}.bin')})
+    environ = builder.get_environ()
+    builder.close()
+    tracemalloc.start()
+    start = time.perf_counter()
+    resp = client.open(environ)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert resp.status_code == 200, resp.status_code
+    return peak / 2**20, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 16, 64], help='file sizes in MB')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config.update(DATABASE=os.path.join(tmp, 'bench.db'), UPLOAD_FOLDER=tmp,
+                          UPLOAD_STORE=os.path.join(tmp, '.store'), UPLOAD_MAX_BYTES=max(args.sizes) * 2**20)
+        init_db()
+        client = app.test_client()
+        print(f"{'Size':>7} {'old peak':>10} {'old time':>10} {'stream peak':>12} {'stream time':>12}")
+        for size in args.sizes:
+            old_peak, old_ms = measure(client, '/bench-upload-old', size * 2**20)
+            new_peak, new_ms = measure(client, '/upload', size * 2**20)
+            print(f'{size:>4} MB {old_peak:>7.2f} MB {old_ms:>7.1f} ms {new_peak:>9.2f} MB {new_ms:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
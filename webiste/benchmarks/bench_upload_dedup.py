@@ -0,0 +1,97 @@
+"""Disk space and writes for many uploads of few distinct files.
+
+``--uploads`` files of ``--size`` KB are uploaded through Flask's test client,
+cycling through ``--distinct`` different contents, once with the old handler
+(request.files and file.save() into the folder, registered on a scratch route
+for the run) and once with the content-addressed /upload. Reported are the
+space the files take on disk, the bytes this process had written to the block
+device by the end (write_bytes minus cancelled_write_bytes from
+/proc/self/io, after a sync; Linux only) and the time per upload.
+
+The scratch folders are created in the current directory, so that they are on
+a real filesystem rather than a tmpfs.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_upload_dedup.py
+    python3 benchmarks/bench_upload_dedup.py --uploads 1000 --distinct 50 --size 64
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db  # noqa: E402
+from flask import request  # noqa: E402
+
+
+@app.route('/bench-upload-old', methods=['POST'])
+def old_upload():
+    file = request.files['file']
+    file.save(os.path.join(app.config['UPLOAD_FOLDER'], file.filename))
+    return 'ok'
+
+
+def disk_usage(path):
+    total = 0
+    seen = set()
+    for root, _, files in os.walk(path):
+        for name in files:
+            st = os.stat(os.path.join(root, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+
+def written_bytes():
+    try:
+        with open('/proc/self/io') as f:
+            io_stats = dict(line.split(': ') for line in f.read().splitlines())
+    except OSError:
+        return None
+    return int(io_stats['write_bytes']) - int(io_stats['cancelled_write_bytes'])
+
+
+def run(path, uploads, contents, folder):
+    client = app.test_client()
+    before = written_bytes()
+    start = time.perf_counter()
+    for i in range(uploads):
+        data = {'file': (io.BytesIO(contents[i % len(contents)]), f'file{i}.bin')}
+        resp = client.post(path, data=data, content_type='multipart/form-data')
+        assert resp.status_code == 200, resp.status_code
+    elapsed = time.perf_counter() - start
+    os.sync()
+    after = written_bytes()
+    written = None if before is None else after - before
+    return disk_usage(folder), written, elapsed / uploads * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=500)
+    parser.add_argument('--distinct', type=int, default=10)
+    parser.add_argument('--size', type=int, default=256, help='file size in KB')
+    args = parser.parse_args()
+
+    contents = [os.urandom(args.size * 1024) for _ in range(args.distinct)]
+    print(f'{args.uploads} uploads of {args.size} KB, {args.distinct} distinct contents')
+    print(f"{'Handler':<20} {'On disk':>10} {'Written':>10} {'Per upload':>11}")
+    for name, path in (('file.save() (old)', '/bench-upload-old'), ('content-addressed', '/upload')):
+        with tempfile.TemporaryDirectory(dir='.') as tmp:
+            folder = os.path.join(tmp, 'uploads')
+            os.makedirs(folder)
+            app.config.update(DATABASE=os.path.join(tmp, 'bench.db'), UPLOAD_FOLDER=folder,
+                              UPLOAD_STORE=os.path.join(folder, '.store'))
+            init_db()
+            usage, written, per_upload = run(path, args.uploads, contents, folder)
+            written = 'n/a' if written is None else f'{written / 2**20:7.1f} MB'
+            print(f'{name:<20} {usage / 2**20:>7.1f} MB {written:>10} {per_upload:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Per-request latency of the /upload listing as the number of files grows.
+
+For each size a scratch upload folder is filled with empty files and the
+uploads index with matching rows. The old listing (os.listdir() and every
+name rendered, registered on a scratch route for the run) is compared with
+GET /upload, which renders one page from the index.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_upload_listing.py
+    python3 benchmarks/bench_upload_listing.py --sizes 1000 100000 --requests 20
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from app import app, init_db  # noqa: E402
+from flask import render_template_string  # noqa: E402
+
+OLD_TEMPLATE = '''<ul>{% for file in files %}<li><a href="/uploads/{{ file }}">{{ file }}</a></li>{% endfor %}</ul>'''
+
+
+@app.route('/bench-upload-listing-old')
+def old_listing():
+    return render_template_string(OLD_TEMPLATE, files=os.listdir(app.config['UPLOAD_FOLDER']))
+
+
+def fill(folder, path, size):
+    names = [f'ratelimit{i}.txt' for i in range(size)]
+    for name in names:
+        open(os.path.join(folder, name), 'wb').close()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO uploads (name, sha256, size, uploaded_at) VALUES (?, '', 0, '2024-01-01 00:00:00')",
+                     ((name,) for name in names))
+    conn.commit()
+    conn.close()
+
+
+def latency_ms(client, path, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        resp = client.get(path)
+        assert resp.status_code == 200, resp.status_code
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000])
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'Files':>8} {'os.listdir (old)':>17} {'indexed page':>13}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = os.path.join(tmp, 'uploads')
+            os.makedirs(folder)
+            db.reset_pool(app)
+            app.config.update(DATABASE=os.path.join(tmp, 'bench.db'), UPLOAD_FOLDER=folder,
+                              UPLOAD_STORE=os.path.join(tmp, 'store'))
+            init_db()
+            fill(folder, app.config['DATABASE'], size)
+            client = app.test_client()
+            old = latency_ms(client, '/bench-upload-listing-old', args.requests)
+            new = latency_ms(client, '/upload', args.requests)
+            db.reset_pool(app)
+        print(f'{size:>8} {old:>14.2f} ms {new:>10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
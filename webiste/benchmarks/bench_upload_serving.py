@@ -0,0 +1,70 @@
+"""Cost of fetching and revalidating an uploaded file.
+
+A file of ``--size`` KB is uploaded to a scratch store and fetched through
+Flask's test client: in full, revalidated with If-None-Match, and as a
+64 KB range. The old handler (send_from_directory on the upload folder,
+registered on a scratch route for the run) is measured the same way. Times
+are per request, including reading the response body.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_upload_serving.py
+    python3 benchmarks/bench_upload_serving.py --size 65536 --requests 100
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db  # noqa: E402
+from flask import send_from_directory  # noqa: E402
+
+
+@app.route('/bench-uploads-old/<filename>')
+def old_uploaded_file(filename):
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+
+def latency_ms(client, url, requests, headers=None, status=200):
+    start = time.perf_counter()
+    for _ in range(requests):
+        resp = client.get(url, headers=headers)
+        resp.get_data()
+        assert resp.status_code == status, resp.status_code
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=2048, help='file size in KB')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config.update(DATABASE=os.path.join(tmp, 'bench.db'), UPLOAD_FOLDER=tmp,
+                          UPLOAD_STORE=os.path.join(tmp, '.store'), UPLOAD_MAX_BYTES=args.size * 1024)
+        init_db()
+        client = app.test_client()
+        content = os.urandom(args.size * 1024)
+        with open(os.path.join(tmp, 'bigfile.txt'), 'wb') as f:
+            f.write(content)
+        resp = client.post('/upload', data={'file': (io.BytesIO(content), 'bigfile.txt')},
+                           content_type='multipart/form-data')
+        assert resp.status_code == 200, resp.status_code
+
+        print(f'{args.size} KB file, ms per request')
+        print(f"{'Handler':<22} {'full':>8} {'304':>8} {'64 KB range':>12}")
+        for name, url in (('send_from_directory', '/bench-uploads-old/bigfile.txt'),
+                          ('content store', '/uploads/bigfile.txt')):
+            etag = client.get(url).headers['ETag']
+            full = latency_ms(client, url, args.requests)
+            revalidate = latency_ms(client, url, args.requests, {'If-None-Match': etag}, 304)
+            ranged = latency_ms(client, url, args.requests, {'Range': 'bytes=0-65535'}, 206)
+            print(f'{name:<22} {full:>8.3f} {revalidate:>8.3f} {ranged:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
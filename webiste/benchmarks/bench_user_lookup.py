@@ -0,0 +1,92 @@
+"""Per-request latency of /register and /login as the users table grows.
+
+For each table size a scratch database is filled with synthetic users and the
+endpoints are driven in-process through Flask's test client. Login is measured
+with the unique username/email indexes and again after dropping them, which is
+the full table scan the app used to do. Passwords are hashed at
+``--work-factor`` (default 7, the lowest werkzeug's scrypt accepts) rather
+than the app's default of 15, so the numbers show the lookups rather than
+scrypt.
+
+Usage (from the webiste directory):
+    python3 benchmarks/bench_user_lookup.py
+    python3 benchmarks/bench_user_lookup.py --sizes 10000 100000 --requests 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from app import app, init_db, login_limiter  # noqa: E402
+
+
+def fill(path, size):
+    conn = sqlite3.connect(path)
+    rows = ((f'user{i}', 'x', f'user{i}@example.com', 'user') for i in range(size))
+    conn.executemany('INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def latency_ms(send, requests):
+    with app.app_context():
+        login_limiter.reset()
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(requests):
+        resp = send(client, i)
+        assert resp.status_code == 200, resp.status_code
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def login(client, i):
+    # One client address per request so the login limiter never answers first.
+    addr = f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+    return client.post('/login', data={'username': f'user{i * 7919 % 1000}', 'password': 'wrongpass'},
+                       environ_overrides={'REMOTE_ADDR': addr})
+
+
+def register_duplicate(client, i):
+    return client.post('/register', data={'username': f'user{i}', 'email': f'new{i}@example.com', 'password': 'secret123'})
+
+
+def register_new(client, i):
+    return client.post('/register', data={'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'secret123'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--work-factor', type=int, default=7, help='PASSWORD_WORK_FACTOR for the run')
+    args = parser.parse_args()
+
+    app.config['PASSWORD_WORK_FACTOR'] = args.work_factor
+
+    print(f"{'Users':>9} {'register (dup)':>15} {'register (new)':>15} {'login':>9} {'login, no index':>16}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.reset_pool(app)
+            app.config['DATABASE'] = os.path.join(tmp, 'bench.db')
+            init_db()
+            fill(app.config['DATABASE'], size)
+            dup = latency_ms(register_duplicate, args.requests)
+            new = latency_ms(register_new, args.requests)
+            indexed = latency_ms(login, args.requests)
+            db.reset_pool(app)
+            conn = sqlite3.connect(app.config['DATABASE'])
+            conn.execute('DROP INDEX idx_users_username')
+            conn.execute('DROP INDEX idx_users_email')
+            conn.close()
+            scan = latency_ms(login, max(args.requests // 10, 10))
+            db.reset_pool(app)
+        print(f'{size:>9} {dup:>12.3f} ms {new:>12.3f} ms {indexed:>6.3f} ms {scan:>13.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
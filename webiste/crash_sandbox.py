@@ -0,0 +1,209 @@
+"""Resource-limited child processes for the /crash simulations.
+
+``type=memory`` used to append 10**8 strings of 1000 bytes to a list in the
+server process, which starved or killed every other request long before it
+raised MemoryError. ``type=loop`` spun a request thread with SIGALRM as the
+only way out, and signal handlers can only be set in the main thread, so under
+a threaded server it failed with ValueError and nothing stopped the spin.
+``CrashSandbox`` runs these scenarios in a fresh Python child instead:
+
+* before running the scenario, the child caps its own address space
+  (RLIMIT_AS) and CPU time (RLIMIT_CPU), turns off core dumps and lowers
+  its priority, so the list runs into MemoryError at the cap, the loop is
+  killed with SIGXCPU and neither takes CPU time from the server's threads,
+* the parent kills the child's process group if it is still running after
+  ``wall_seconds``, for a scenario that blocks instead of using CPU,
+* at most ``workers`` children run at once. Beyond that Busy is raised, so
+  a burst of crash requests cannot fork without limit, and
+* the child reports back as one line of JSON on stdout: the scenario's return
+  value, or the type, message and traceback of the exception it raised.
+
+The server's own memory and CPU are never touched, so the crash suite can run
+alongside the others.
+
+The sandbox is configured from ``app.config``: CRASH_SANDBOX_WORKERS,
+CRASH_MEMORY_LIMIT (bytes), CRASH_CPU_SECONDS and CRASH_WALL_SECONDS. The
+``resource`` module is Unix-only; without it the child runs without rlimits
+and only the wall-clock kill applies.
+"""
+import asyncio
+import builtins
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock limit applies
+    resource = None
+
+DEFAULT_WORKERS = 2
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_CPU_SECONDS = 3
+DEFAULT_WALL_SECONDS = 5.0
+# Added to the child's nice value, so the server's own threads get the CPU
+# first.
+CHILD_NICENESS = 10
+# The JSON report; a scenario's output beyond this is not read.
+MAX_REPORT = 64 * 1024
+
+# outcome is 'ok' (output is the scenario's return value), 'exception' (error,
+# message and traceback describe it), 'cpu_limit', 'killed' (wall clock) or
+# 'failed' (the child died without a report; message says how).
+Result = namedtuple('Result', 'outcome seconds output error message traceback')
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def _memory():
+    a = []
+    for _ in range(10**8):
+        a.append('x' * 1000)
+    return "Should have triggered MemoryError"
+
+
+def _loop():
+    while True:
+        pass
+
+
+SCENARIOS = {'memory': _memory, 'loop': _loop}
+
+
+class CrashSandbox:
+    """Run crash scenarios in limited child processes, a few at a time."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, memory_limit=DEFAULT_MEMORY_LIMIT,
+                 cpu_seconds=DEFAULT_CPU_SECONDS, wall_seconds=DEFAULT_WALL_SECONDS):
+        self.workers = workers
+        self.memory_limit = memory_limit
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def _argv(self, scenario):
+        if scenario not in SCENARIOS:
+            raise ValueError(f'unknown crash scenario {scenario!r}')
+        return [sys.executable, os.path.abspath(__file__), scenario, str(self.memory_limit), str(self.cpu_seconds)]
+
+    def run(self, scenario):
+        """Run scenario in a child and return its Result. Raises Busy."""
+        argv = self._argv(scenario)
+        if not self._slots.acquire(blocking=False):
+            raise Busy(scenario)
+        try:
+            start = time.monotonic()
+            proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, start_new_session=True)
+            killed = False
+            try:
+                report, _ = proc.communicate(timeout=self.wall_seconds)
+            except subprocess.TimeoutExpired:
+                killed = True
+                _kill(proc)
+                report, _ = proc.communicate()
+            return _result(report, proc.returncode, killed, time.monotonic() - start)
+        finally:
+            self._slots.release()
+
+    async def run_async(self, scenario):
+        """Like run(), waiting for the child on the event loop."""
+        argv = self._argv(scenario)
+        if not self._slots.acquire(blocking=False):
+            raise Busy(scenario)
+        try:
+            start = time.monotonic()
+            proc = await asyncio.create_subprocess_exec(*argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                                        stderr=subprocess.DEVNULL, start_new_session=True)
+            killed = False
+            try:
+                report, _ = await asyncio.wait_for(proc.communicate(), self.wall_seconds)
+            except asyncio.TimeoutError:
+                killed = True
+                _kill(proc)
+                report, _ = await proc.communicate()
+            return _result(report, proc.returncode, killed, time.monotonic() - start)
+        finally:
+            self._slots.release()
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _result(report, returncode, killed, seconds):
+    if killed:
+        return Result('killed', seconds, None, None, f'killed after {seconds:.1f}s of wall-clock time', None)
+    if returncode == -signal.SIGXCPU:
+        return Result('cpu_limit', seconds, None, None, 'stopped by the CPU time limit', None)
+    try:
+        data = json.loads(report[:MAX_REPORT])
+    except ValueError:
+        return Result('failed', seconds, None, None, f'exited with status {returncode} without a report', None)
+    return Result(data['outcome'], seconds, data.get('output'), data.get('error'), data.get('message'),
+                  data.get('traceback'))
+
+
+def reraise(result):
+    """Raise the exception a child reported, as the builtin of that name if there is one."""
+    exc_type = getattr(builtins, result.error or '', None)
+    if not (isinstance(exc_type, type) and issubclass(exc_type, Exception)):
+        exc_type = RuntimeError
+    raise exc_type(f'{result.message or result.error} (in the crash sandbox)\n\n{result.traceback}')
+
+
+def _child(scenario, memory_limit, cpu_seconds):
+    if hasattr(os, 'nice'):
+        os.nice(CHILD_NICENESS)
+        # The child is in a session of its own, which Linux schedules as a
+        # separate group when autogroup is on; the group needs the nice
+        # value too.
+        try:
+            with open('/proc/self/autogroup', 'w') as f:
+                f.write(str(CHILD_NICENESS))
+        except OSError:
+            pass
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    try:
+        report = {'outcome': 'ok', 'output': str(SCENARIOS[scenario]())}
+    except Exception as e:
+        # Drop the scenario's locals (the list of strings) before formatting.
+        traceback.clear_frames(e.__traceback__)
+        report = {'outcome': 'exception', 'error': type(e).__name__, 'message': str(e),
+                  'traceback': traceback.format_exc()}
+    sys.stdout.write(json.dumps(report))
+    sys.stdout.flush()
+
+
+def get_sandbox(app=None):
+    """Return the app's crash sandbox, creating it on first use."""
+    # Imported here: each child runs this module as a script, and should not
+    # load Flask before its scenario.
+    from flask import current_app
+    app = app or current_app
+    sandbox = app.extensions.get('crash_sandbox')
+    if sandbox is None:
+        sandbox = app.extensions['crash_sandbox'] = CrashSandbox(
+            app.config.setdefault('CRASH_SANDBOX_WORKERS', DEFAULT_WORKERS),
+            app.config.setdefault('CRASH_MEMORY_LIMIT', DEFAULT_MEMORY_LIMIT),
+            app.config.setdefault('CRASH_CPU_SECONDS', DEFAULT_CPU_SECONDS),
+            app.config.setdefault('CRASH_WALL_SECONDS', DEFAULT_WALL_SECONDS))
+    return sandbox
+
+
+if __name__ == '__main__':
+    _child(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
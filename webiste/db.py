@@ -0,0 +1,168 @@
+"""SQLite connection pool for the demo app.
+
+Opening a connection for every request means re-reading the schema and
+throwing away sqlite3's statement cache each time. Handlers instead call
+``get_db()``, which checks a connection out of a pool for the rest of the
+request; it is rolled back if a transaction was left open and put back when
+the app context ends.
+
+Every pooled connection is opened with:
+
+* ``journal_mode=WAL`` so readers do not block the writer,
+* ``busy_timeout`` so a writer waits for a lock instead of failing with
+  "database is locked", and
+* a statement cache (``cached_statements``), so the parameterised queries the
+  handlers run over and over are compiled once per connection and then reused
+  as prepared statements.
+
+The pool is configured from ``app.config``: DATABASE (path of the database
+file), DB_POOL_SIZE (connections kept open, 0 opens a new connection per
+request as before), DB_BUSY_TIMEOUT (milliseconds) and DB_POOL_TIMEOUT (seconds
+a request waits for a free connection).
+"""
+import queue
+import sqlite3
+import threading
+
+from flask import current_app, g
+
+DEFAULT_DATABASE = 'users.db'
+DEFAULT_POOL_SIZE = 8
+DEFAULT_BUSY_TIMEOUT = 5000
+DEFAULT_POOL_TIMEOUT = 10.0
+CACHED_STATEMENTS = 256
+
+
+def connect(path, busy_timeout=DEFAULT_BUSY_TIMEOUT):
+    """Open a connection with the pragmas every handler expects."""
+    conn = sqlite3.connect(path, timeout=busy_timeout / 1000, cached_statements=CACHED_STATEMENTS,
+                           check_same_thread=False)
+    conn.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections shared by all request threads.
+
+    Connections are created lazily up to ``size``. Once that many are checked
+    out, ``acquire`` waits up to ``timeout`` seconds for one to be released.
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, busy_timeout=DEFAULT_BUSY_TIMEOUT, timeout=DEFAULT_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.timeout = timeout
+        # LIFO keeps the most recently used connections (and their caches) warm.
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return connect(self.path, self.busy_timeout)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f'no database connection became free within {self.timeout}s') from None
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped; a new one is opened on demand.
+            with self._lock:
+                self._created -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class _Unpooled:
+    """Pool interface that opens a new connection for every request."""
+
+    def __init__(self, path, busy_timeout=DEFAULT_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def acquire(self):
+        return connect(self.path, self.busy_timeout)
+
+    def release(self, conn):
+        conn.close()
+
+    def close(self):
+        pass
+
+
+def _create_pool(app):
+    path = app.config.setdefault('DATABASE', DEFAULT_DATABASE)
+    size = app.config.setdefault('DB_POOL_SIZE', DEFAULT_POOL_SIZE)
+    busy_timeout = app.config.setdefault('DB_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT)
+    timeout = app.config.setdefault('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT)
+    if size <= 0:
+        return _Unpooled(path, busy_timeout)
+    return ConnectionPool(path, size, busy_timeout, timeout)
+
+
+def get_pool(app=None):
+    """Return the app's pool, (re)creating it if the configuration changed."""
+    app = app or current_app
+    pool = app.extensions.get('db_pool')
+    if pool is None or pool.path != app.config.get('DATABASE', DEFAULT_DATABASE):
+        if pool is not None:
+            pool.close()
+        pool = app.extensions['db_pool'] = _create_pool(app)
+    return pool
+
+
+def reset_pool(app):
+    """Close every idle connection; the pool is rebuilt from app.config on next use."""
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.close()
+
+
+def get_db():
+    """Return the connection checked out for the current request."""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def release_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def init_app(app):
+    app.teardown_appcontext(release_db)
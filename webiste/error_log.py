@@ -0,0 +1,155 @@
+"""Error log written from a background thread, with repeated traces counted.
+
+app.py used to call ``logging.basicConfig(filename='error_demo.log')``, so
+every ``logging.error(..., exc_info=True)`` wrote its traceback to disk from
+the request thread before the response went out. The crash suite raises the
+same few exceptions over and over, and each copy was written in full to a
+file that grew without limit. ``setup()`` instead:
+
+* puts a ``DedupQueueHandler`` on the root logger. A request thread only
+  fingerprints the record, formats it and puts it on a queue; a
+  QueueListener thread writes it,
+* writes to a RotatingFileHandler, which keeps the file under ``max_bytes``
+  plus ``backup_count`` old files,
+* fingerprints each record: the exception type and the file, line and
+  function of every frame of its traceback, or the call site and message of
+  a record without one. A fingerprint that was already logged in the last
+  ``window`` seconds is not logged again. It is counted instead, and after
+  the window the count is written as one line with the same fingerprint,
+  along with the next record logged or at exit.
+
+Every line carries its fingerprint in brackets, so the count can be matched
+with the full record:
+
+    2026-10-17 08:46:36,796 ERROR [3f0c2a91] Crash demo error: ZeroDivisionError(...)
+    2026-10-17 08:47:37,012 ERROR [3f0c2a91] 41 identical records within 60s of the first
+
+The queue is drained by logging.shutdown(), which runs at exit; serve.py's
+workers call it when they stop. Records still queued when a process is
+killed outright are lost.
+"""
+import hashlib
+import logging
+import os
+import queue
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_WINDOW = 60.0
+# Fingerprints remembered at once; beyond this the oldest is dropped early
+# (its count is still written).
+MAX_FINGERPRINTS = 1024
+FORMAT = '%(asctime)s %(levelname)s [%(fingerprint)s] %(message)s'
+
+
+def fingerprint(record):
+    """A short hash identifying records that carry the same trace."""
+    h = hashlib.sha1(record.name.encode())
+    if record.exc_info and record.exc_info[1] is not None:
+        exc_type, _, tb = record.exc_info
+        h.update(exc_type.__qualname__.encode())
+        while tb is not None:
+            code = tb.tb_frame.f_code
+            h.update(f'\0{code.co_filename}:{tb.tb_lineno}:{code.co_name}'.encode())
+            tb = tb.tb_next
+    else:
+        h.update(f'\0{record.pathname}:{record.lineno}\0{record.getMessage()}'.encode())
+    return h.hexdigest()[:8]
+
+
+class DedupQueueHandler(QueueHandler):
+    """A QueueHandler that passes on one record per fingerprint per window.
+
+    Records are written to ``target`` by a QueueListener thread between
+    start() and close(). close(), which logging.shutdown() calls at exit,
+    writes the open counts and waits for the queue to drain.
+    """
+
+    def __init__(self, queue, target, window=DEFAULT_WINDOW, max_fingerprints=MAX_FINGERPRINTS,
+                 clock=time.monotonic):
+        super().__init__(queue)
+        self.target = target
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self._clock = clock
+        self._listener = None
+        # fingerprint -> [logged at, repeats since], oldest first. Only used
+        # under the handler's lock (Handler.handle() holds it around emit()).
+        self._seen = OrderedDict()
+
+    def start(self):
+        self._listener = QueueListener(self.queue, self.target)
+        self._listener.start()
+
+    def emit(self, record):
+        now = self._clock()
+        self._expire(now)
+        key = fingerprint(record)
+        entry = self._seen.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return
+        self._seen[key] = [now, 0]
+        record.fingerprint = key
+        super().emit(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            self._expire(None)
+        finally:
+            self.release()
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+            self.target.close()
+        super().close()
+
+    def _after_fork(self):
+        # The parent's writer thread does not exist in a forked child, and
+        # the queue may have been locked by it. Start both again.
+        if self._listener is not None:
+            self.queue = queue.SimpleQueue()
+            self.start()
+
+    def _expire(self, now):
+        # Entries are in the order they were logged, so the expired ones are
+        # at the front. now=None expires them all.
+        while self._seen:
+            key, (logged, repeats) = next(iter(self._seen.items()))
+            if now is not None and now - logged < self.window and len(self._seen) < self.max_fingerprints:
+                break
+            del self._seen[key]
+            if repeats:
+                self.enqueue(self._count_record(key, repeats))
+
+    def _count_record(self, key, repeats):
+        record = logging.LogRecord(__name__, logging.ERROR, __file__, 0,
+                                   f'{repeats} identical records within {self.window:g}s of the first', None, None)
+        record.fingerprint = key
+        return record
+
+
+def setup(filename, level=logging.ERROR, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+          window=DEFAULT_WINDOW):
+    """Log the root logger's records at level and above to filename, off the calling thread.
+
+    Like logging.basicConfig, does nothing if the root logger already has
+    handlers. Returns the DedupQueueHandler, or None.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    target = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    target.setFormatter(logging.Formatter(FORMAT))
+    handler = DedupQueueHandler(queue.SimpleQueue(), target, window)
+    handler.setLevel(level)
+    root.addHandler(handler)
+    root.setLevel(level)
+    handler.start()
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=handler._after_fork)
+    return handler
@@ -0,0 +1,151 @@
+"""Versioned schema migrations for users.db.
+
+The schema version is stored in the database header (``PRAGMA user_version``).
+``migrate()`` is called once from ``init_db()`` at startup and applies every
+migration newer than that version in order, each in its own transaction
+together with the version bump, so request handlers only ever run DML.
+
+Migrations must be idempotent: databases created by older versions of the app
+already have some of these tables and columns (the ``/comments`` view used to
+add them on the fly), so a migration checks what exists before changing it.
+To change the schema, append a new function to ``MIGRATIONS``; never edit one
+that has already shipped.
+"""
+import sqlite3
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_column(conn, table, column, definition):
+    if column not in _columns(conn, table):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def base_schema(conn):
+    """users and comments, including columns missing from the first releases."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY, username TEXT, password TEXT, email TEXT, role TEXT)''')
+    if 'role' not in _columns(conn, 'users'):
+        conn.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'user'")
+        conn.execute("UPDATE users SET role='admin' WHERE username='admin'")
+    conn.execute('''CREATE TABLE IF NOT EXISTS comments
+                 (id INTEGER PRIMARY KEY, content TEXT, username TEXT, timestamp TEXT)''')
+    _add_column(conn, 'comments', 'username', 'TEXT')
+    _add_column(conn, 'comments', 'timestamp', 'TEXT')
+
+
+def comment_threads(conn):
+    """Replies, soft deletes and votes for /comments."""
+    _add_column(conn, 'comments', 'parent_id', 'INTEGER')
+    _add_column(conn, 'comments', 'deleted', 'INTEGER DEFAULT 0')
+    conn.execute('''CREATE TABLE IF NOT EXISTS comment_votes (
+        id INTEGER PRIMARY KEY, comment_id INTEGER, username TEXT, vote INTEGER)''')
+
+
+def comment_scores(conn):
+    """Denormalised vote totals on comments and an index for vote lookups."""
+    if 'score' not in _columns(conn, 'comments'):
+        conn.execute('ALTER TABLE comments ADD COLUMN score INTEGER NOT NULL DEFAULT 0')
+        conn.execute('''UPDATE comments SET score = COALESCE(
+            (SELECT SUM(vote) FROM comment_votes WHERE comment_votes.comment_id = comments.id), 0)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_comment_votes_comment_user ON comment_votes (comment_id, username)')
+
+
+def comment_parent_index(conn):
+    """Index for loading the replies of a page of threads."""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (parent_id, deleted)')
+
+
+def unique_user_identity(conn):
+    """Unique indexes on users.username and users.email.
+
+    Rows that duplicate an earlier row's username or email (possible before
+    the indexes existed) get the row id appended to the duplicate value, so
+    the index can be built and every account stays reachable by id.
+    """
+    for column in ('username', 'email'):
+        conn.execute(f'''UPDATE users SET {column} = {column} || '#' || id
+                         WHERE {column} IS NOT NULL AND id > (
+                             SELECT MIN(id) FROM users AS first WHERE first.{column} = users.{column})''')
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_users_{column} ON users ({column})')
+
+
+def user_search_index(conn):
+    """Trigram full-text index over users.username and users.email for /search.
+
+    The index is an external-content FTS5 table kept in sync by triggers.
+    SQLite builds without FTS5 or the trigram tokenizer skip it, and /search
+    falls back to a parameterised LIKE query until a later startup on a build
+    that has them creates the index (see OPTIONAL).
+    """
+    try:
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+                            username, email, content='users', content_rowid='id', tokenize='trigram')''')
+    except sqlite3.OperationalError:
+        return
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+                        INSERT INTO users_fts (rowid, username, email) VALUES (new.id, new.username, new.email);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+                        INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email ON users BEGIN
+                        INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+                        INSERT INTO users_fts (rowid, username, email) VALUES (new.id, new.username, new.email);
+                    END''')
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+
+def upload_index(conn):
+    """Index of uploaded file names to content hashes for the upload store."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS uploads (
+                        name TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, uploaded_at TEXT NOT NULL)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_uploads_sha256 ON uploads (sha256)')
+
+
+MIGRATIONS = [
+    base_schema,
+    comment_threads,
+    comment_scores,
+    comment_parent_index,
+    unique_user_identity,
+    user_search_index,
+    upload_index,
+]
+
+# Migrations that skip themselves when SQLite lacks a feature, with the table
+# they create. The version is bumped either way so later migrations still
+# apply; migrate() runs these again at every startup until the table exists.
+OPTIONAL = {user_search_index: 'users_fts'}
+
+
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to the latest schema version and return it."""
+    while True:
+        # IMMEDIATE takes the write lock up front, so two processes starting
+        # at once cannot both apply the same migration.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = schema_version(conn)
+            if version >= len(MIGRATIONS):
+                for migration, table in OPTIONAL.items():
+                    if not has_table(conn, table):
+                        migration(conn)
+                conn.commit()
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
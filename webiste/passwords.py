@@ -0,0 +1,185 @@
+"""Password hashing for /register, /login and /change-password.
+
+Passwords used to be stored as a single unsalted SHA-256 (and
+/change-password stored them as given), which a GPU can brute-force at
+billions of guesses per second. ``PasswordHasher`` stores werkzeug's
+salted scrypt hashes (``scrypt:N:8:1$salt$hash``) instead. Each hash is
+deliberately slow and memory-hungry (about 145 ms and 32 MB at the default
+work factor of 15, N = 2**15), so it is handled like a ping:
+
+* hashes run on a small thread pool. ``hashlib.scrypt`` releases the GIL, so
+  the pool uses every core, and at most ``workers`` hashes (and their memory)
+  run at once. Once ``queue`` more are waiting, requests are turned away as
+  busy instead of piling up behind a brute-force run,
+* a successful check is cached for ``cache_ttl`` seconds, so a client that
+  logs in repeatedly pays the cost once. The cache key is an HMAC, under a
+  random per-process nonce, of the stored hash and the password, so the
+  cache never holds a password and a changed password never hits a stale
+  entry. Failed checks are not cached,
+* a row still holding a legacy unsalted SHA-256 is checked the old way and
+  rehashed with scrypt on its first successful login, as is a row hashed
+  with a different work factor, and
+* every check that does not hit the cache costs one scrypt hash. An unknown
+  user or a failed legacy check is hashed against a dummy, so response time
+  does not tell whether a user exists. Cache hits are the exception: they
+  skip the hash, so a fast answer means the password is right and was
+  checked in the last ``cache_ttl`` seconds. Only right passwords are
+  cached, so a guess is never told apart by its timing alone, but a caller
+  that hides whether the password was right should set ``cache_size`` to 0.
+
+The hasher is configured from ``app.config``: PASSWORD_WORK_FACTOR (log2 of
+scrypt's N), PASSWORD_WORKERS, PASSWORD_QUEUE, PASSWORD_CACHE_SIZE and
+PASSWORD_CACHE_TTL (seconds).
+"""
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_WORK_FACTOR = 15
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_QUEUE = 16
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 300.0
+
+_LEGACY_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def method_for(work_factor):
+    return f'scrypt:{2 ** work_factor}:8:1'
+
+
+def is_legacy(stored):
+    return bool(stored) and _LEGACY_SHA256.match(stored) is not None
+
+
+class PasswordHasher:
+    """Hash and check passwords on a bounded pool, caching successful checks."""
+
+    def __init__(self, work_factor=DEFAULT_WORK_FACTOR, workers=DEFAULT_WORKERS, queue=DEFAULT_QUEUE,
+                 cache_size=DEFAULT_CACHE_SIZE, cache_ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.work_factor = work_factor
+        self.method = method_for(work_factor)
+        self.workers = workers
+        self.queue = queue
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='passwords')
+        self._pending = 0
+        self._nonce = secrets.token_bytes(32)
+        # cache key -> expiry time, least recently used first.
+        self._verified = OrderedDict()
+        self._dummy = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue:
+                raise Busy()
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda f: self._release())
+        return future.result()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password):
+        """Return a new salted hash of password. Raises Busy."""
+        return self._submit(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        """Check password against a stored hash (None for an unknown user).
+
+        Returns ``(ok, new_hash)``. new_hash is set when the password was
+        right but stored is a legacy SHA-256 or uses another work factor; the
+        caller should save it in place of stored. Raises Busy.
+        """
+        if stored and stored.startswith(('scrypt:', 'pbkdf2:')):
+            key = self._cache_key(stored, password)
+            if self._cached(key):
+                return True, None
+            if not self._submit(check_password_hash, stored, password):
+                return False, None
+            self._remember(key)
+            if stored.split('$', 1)[0] != self.method:
+                return True, self.hash(password)
+            return True, None
+        if is_legacy(stored) and hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored):
+            return True, self.hash(password)
+        self._submit(check_password_hash, self._dummy_hash(), password)
+        return False, None
+
+    def _dummy_hash(self):
+        if self._dummy is None:
+            self._dummy = generate_password_hash(secrets.token_hex(16), self.method)
+        return self._dummy
+
+    def _cache_key(self, stored, password):
+        return hmac.new(self._nonce, f'{stored}\0{password}'.encode(), hashlib.sha256).digest()
+
+    def _cached(self, key):
+        if not self.cache_size:
+            return False
+        with self._lock:
+            expires = self._verified.get(key)
+            if expires is None:
+                return False
+            if expires <= self.clock():
+                del self._verified[key]
+                return False
+            self._verified.move_to_end(key)
+            return True
+
+    def _remember(self, key):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._verified[key] = self.clock() + self.cache_ttl
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def clear_cache(self):
+        with self._lock:
+            self._verified.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _create_hasher(app):
+    return PasswordHasher(app.config.setdefault('PASSWORD_WORK_FACTOR', DEFAULT_WORK_FACTOR),
+                          app.config.setdefault('PASSWORD_WORKERS', DEFAULT_WORKERS),
+                          app.config.setdefault('PASSWORD_QUEUE', DEFAULT_QUEUE),
+                          app.config.setdefault('PASSWORD_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+                          app.config.setdefault('PASSWORD_CACHE_TTL', DEFAULT_CACHE_TTL))
+
+
+def get_hasher(app=None):
+    """Return the app's password hasher, (re)creating it if the work factor changed."""
+    app = app or current_app
+    hasher = app.extensions.get('password_hasher')
+    if hasher is None or hasher.work_factor != app.config.get('PASSWORD_WORK_FACTOR', DEFAULT_WORK_FACTOR):
+        if hasher is not None:
+            hasher.close()
+        hasher = app.extensions['password_hasher'] = _create_hasher(app)
+    return hasher
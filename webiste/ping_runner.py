@@ -0,0 +1,276 @@
+"""Bounded, cached execution of ``ping`` for the /ping route.
+
+The route used to run ``os.popen(f'ping -c 1 {host}')``: a shell per request,
+no timeout, and the request thread blocked for as long as ping took, so a
+burst of pings to a slow host tied up the whole server. ``PingRunner``
+instead:
+
+* validates the host (an IP address or an RFC 1123 hostname) and runs
+  ``ping`` with an argument list, never through a shell,
+* runs at most ``workers`` pings at once on a small thread pool and turns
+  requests away as busy once ``queue`` more are waiting, so at most
+  ``workers + queue`` request threads are ever waiting on ping and the rest
+  stay free for other routes,
+* kills ping after ``timeout`` seconds and reads at most ``max_output`` bytes
+  of its output, and
+* caches each host's result for ``cache_ttl`` seconds. Requests for a host
+  whose ping is still running wait for that ping instead of starting another.
+
+``AsyncPingRunner`` applies the same limits and cache on an asyncio event
+loop for asgi.py. There a ping is an asyncio subprocess that the loop waits
+on, so no thread is held while it runs.
+
+The runners are configured from ``app.config``: PING_WORKERS, PING_QUEUE,
+PING_TIMEOUT (seconds), PING_MAX_OUTPUT (bytes) and PING_CACHE_TTL (seconds).
+"""
+import asyncio
+import ipaddress
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 4
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_OUTPUT = 16 * 1024
+DEFAULT_CACHE_TTL = 10.0
+MAX_HOST_LENGTH = 253
+
+_LABEL = re.compile(r'^(?!-)[A-Za-z0-9-]{1,63}(?<!-)$')
+
+
+class InvalidHost(ValueError):
+    pass
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def validate_host(host):
+    """Return host stripped of surrounding blanks, or raise InvalidHost."""
+    host = host.strip()
+    if not host or len(host) > MAX_HOST_LENGTH:
+        raise InvalidHost(host)
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        pass
+    labels = host.rstrip('.').split('.')
+    if not all(_LABEL.match(label) for label in labels) or labels[-1].isdigit():
+        raise InvalidHost(host)
+    return host
+
+
+def ping_argv(host):
+    return ['ping', '-c', '1', host]
+
+
+class PingRunner:
+    """Run pings on a bounded pool and cache the output per host."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue=DEFAULT_QUEUE, timeout=DEFAULT_TIMEOUT,
+                 max_output=DEFAULT_MAX_OUTPUT, cache_ttl=DEFAULT_CACHE_TTL):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.max_output = max_output
+        self.cache_ttl = cache_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ping')
+        # host -> (expires, future); expires is None while the ping runs.
+        self._cache = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def ping(self, host):
+        """Return ping's output for a validated host.
+
+        Raises InvalidHost for a bad host and Busy when too many pings are
+        already running or waiting.
+        """
+        host = validate_host(host)
+        now = time.monotonic()
+        started = False
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                future = entry[1]
+            else:
+                if self._pending >= self.workers + self.queue:
+                    raise Busy(host)
+                self._pending += 1
+                future = self._executor.submit(self._run, host)
+                self._cache[host] = (None, future)
+                started = True
+                if len(self._cache) > 4 * (self.workers + self.queue):
+                    _expire(self._cache, now)
+        if started:
+            # Outside the lock: a ping that has already finished (ping
+            # missing, say) runs the callback right here, and it takes the
+            # lock itself.
+            future.add_done_callback(lambda f, host=host: self._finished(host, f))
+        return future.result()
+
+    def _finished(self, host, future):
+        with self._lock:
+            self._pending -= 1
+            if self._cache.get(host, (None, None))[1] is future:
+                self._cache[host] = (time.monotonic() + self.cache_ttl, future)
+
+    def _run(self, host):
+        try:
+            # A session of its own lets kill() take down anything ping
+            # started along with it, so nothing keeps the pipe open.
+            proc = subprocess.Popen(ping_argv(host), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, start_new_session=True)
+        except OSError as e:
+            return f'ping could not be started: {e.strerror}'
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            _kill(proc)
+
+        timer = threading.Timer(self.timeout, kill)
+        timer.start()
+        try:
+            output = proc.stdout.read(self.max_output + 1)
+            truncated = len(output) > self.max_output
+            if truncated:
+                _kill(proc)
+            proc.wait()
+        finally:
+            timer.cancel()
+            proc.stdout.close()
+        return _format(output, self.max_output, truncated, timed_out.is_set(), self.timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncPingRunner:
+    """Run pings as asyncio subprocesses, with PingRunner's limits and cache."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue=DEFAULT_QUEUE, timeout=DEFAULT_TIMEOUT,
+                 max_output=DEFAULT_MAX_OUTPUT, cache_ttl=DEFAULT_CACHE_TTL):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.max_output = max_output
+        self.cache_ttl = cache_ttl
+        self._slots = asyncio.Semaphore(workers)
+        # host -> (expires, task); expires is None while the ping runs.
+        self._cache = {}
+        self._pending = 0
+
+    async def ping(self, host):
+        """Return ping's output for a validated host.
+
+        Raises InvalidHost for a bad host and Busy when too many pings are
+        already running or waiting. Must be awaited on a single event loop.
+        """
+        host = validate_host(host)
+        now = time.monotonic()
+        entry = self._cache.get(host)
+        if entry is not None and (entry[0] is None or entry[0] > now):
+            task = entry[1]
+        else:
+            if self._pending >= self.workers + self.queue:
+                raise Busy(host)
+            self._pending += 1
+            task = asyncio.ensure_future(self._run(host))
+            self._cache[host] = (None, task)
+            task.add_done_callback(lambda t, host=host: self._finished(host, t))
+            if len(self._cache) > 4 * (self.workers + self.queue):
+                _expire(self._cache, now)
+        # Other requests may be waiting on the same ping; a client that goes
+        # away must not cancel it for them.
+        return await asyncio.shield(task)
+
+    def _finished(self, host, task):
+        self._pending -= 1
+        if self._cache.get(host, (None, None))[1] is task:
+            self._cache[host] = (time.monotonic() + self.cache_ttl, task)
+
+    async def _run(self, host):
+        async with self._slots:
+            try:
+                proc = await asyncio.create_subprocess_exec(*ping_argv(host), stdin=subprocess.DEVNULL,
+                                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                            start_new_session=True)
+            except OSError as e:
+                return f'ping could not be started: {e.strerror}'
+            output = bytearray()
+
+            async def collect():
+                while len(output) <= self.max_output:
+                    chunk = await proc.stdout.read(self.max_output + 1 - len(output))
+                    if not chunk:
+                        break
+                    output.extend(chunk)
+                if len(output) > self.max_output:
+                    _kill(proc)
+                await proc.wait()
+
+            timed_out = False
+            try:
+                await asyncio.wait_for(collect(), self.timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                _kill(proc)
+                await proc.wait()
+            return _format(bytes(output), self.max_output, len(output) > self.max_output, timed_out, self.timeout)
+
+
+def _expire(cache, now):
+    for host, (expires, _) in list(cache.items()):
+        if expires is not None and expires <= now:
+            del cache[host]
+
+
+def _format(output, max_output, truncated, timed_out, timeout):
+    text = output[:max_output].decode('utf-8', 'replace')
+    if truncated:
+        text += f'\n[output truncated at {max_output} bytes]'
+    elif timed_out:
+        text += f'\n[ping timed out after {timeout:g}s]'
+    return text
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _create_runner(app, cls=PingRunner):
+    return cls(app.config.setdefault('PING_WORKERS', DEFAULT_WORKERS),
+               app.config.setdefault('PING_QUEUE', DEFAULT_QUEUE),
+               app.config.setdefault('PING_TIMEOUT', DEFAULT_TIMEOUT),
+               app.config.setdefault('PING_MAX_OUTPUT', DEFAULT_MAX_OUTPUT),
+               app.config.setdefault('PING_CACHE_TTL', DEFAULT_CACHE_TTL))
+
+
+def get_runner(app=None):
+    """Return the app's ping runner, creating it on first use."""
+    app = app or current_app
+    runner = app.extensions.get('ping_runner')
+    if runner is None:
+        runner = app.extensions['ping_runner'] = _create_runner(app)
+    return runner
+
+
+def get_async_runner(app=None):
+    """Return the app's asyncio ping runner, creating it on first use."""
+    app = app or current_app
+    runner = app.extensions.get('async_ping_runner')
+    if runner is None:
+        runner = app.extensions['async_ping_runner'] = _create_runner(app, AsyncPingRunner)
+    return runner
@@ -0,0 +1,357 @@
+"""Sliding-window rate limiting with pluggable storage.
+
+A limiter splits its window into ``buckets`` slots of ``window / buckets``
+seconds and keeps a hit counter per client key and slot. A hit is allowed
+while the counters of the slots still inside the window add up to less than
+``limit``; as time moves on, the oldest slot drops out, so attempts expire in
+steps of one slot rather than all at once. Only allowed hits are counted, so a
+client that keeps hammering a blocked endpoint is released on schedule.
+
+The counters live in a backend:
+
+* ``MemoryBackend`` (the default) keeps them in the process. Each key gets a
+  ``_Window``, a ring of counters packed into a single integer (16 bits per
+  counter), so a key costs one small object. Keys are kept in
+  least-recently-used order; keys idle for longer than the window are dropped
+  as new keys arrive, and ``max_keys`` caps each limiter's table, so a scan
+  from many source addresses cannot grow it without bound.
+* ``SQLiteBackend`` keeps them in a small WAL-mode SQLite database that every
+  worker process opens, so a limit holds across all workers instead of once
+  per worker. Each hit is one ``BEGIN IMMEDIATE`` transaction (sum the live
+  slots, then upsert the current one), which makes the check-and-count atomic
+  across processes. Expired slots are purged once per slot.
+
+The app picks a backend from ``app.config``: RATE_LIMIT_DATABASE is the path of
+the shared database, or empty to count in memory. Limiters are declared once
+and used as decorators:
+
+    search_limiter = RateLimiter('search', 120, 60)
+
+    @app.route('/search', methods=['GET', 'POST'])
+    @search_limiter.limit(methods=('GET', 'POST'), on_limit=lambda message: render_template('search.html', error=message))
+    def search():
+        ...
+
+A view that only learns later whether a request should count, such as a
+login, takes a slot with ``reserve()`` before doing the work and gives it back
+with ``undo()`` if the request turns out not to count. The check and the count
+stay one atomic step, so concurrent requests cannot all pass the check before
+any of them is counted.
+"""
+import contextlib
+import functools
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from flask import current_app, make_response, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on SQLite's busy timeout alone
+    fcntl = None
+
+import db
+
+DEFAULT_BUCKETS = 6
+DEFAULT_MAX_KEYS = 100_000
+DEFAULT_MESSAGE = 'Too many requests (rate limit exceeded). Please try again later.'
+
+COUNTER_BITS = 16
+COUNTER_MASK = (1 << COUNTER_BITS) - 1
+
+
+class _Window:
+    """Ring of per-bucket hit counters for one key.
+
+    ``bucket`` is the absolute index of the newest bucket; counter ``b % size``
+    of ``counts`` holds the hits of bucket ``b``.
+    """
+
+    __slots__ = ('bucket', 'counts', 'total')
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.counts = 0
+        self.total = 0
+
+    def advance(self, bucket, size):
+        """Clear the counters of every bucket that has left the window."""
+        if bucket - self.bucket >= size:
+            self.counts = 0
+            self.total = 0
+        else:
+            for b in range(self.bucket + 1, bucket + 1):
+                shift = (b % size) * COUNTER_BITS
+                self.total -= (self.counts >> shift) & COUNTER_MASK
+                self.counts &= ~(COUNTER_MASK << shift)
+        self.bucket = bucket
+
+    def add(self, size):
+        self.counts += 1 << ((self.bucket % size) * COUNTER_BITS)
+        self.total += 1
+
+    def remove(self, bucket, size):
+        """Take back one hit of bucket, if that bucket is still in the window."""
+        if not 0 <= self.bucket - bucket < size:
+            return
+        shift = (bucket % size) * COUNTER_BITS
+        if (self.counts >> shift) & COUNTER_MASK:
+            self.counts -= 1 << shift
+            self.total -= 1
+
+
+class MemoryBackend:
+    """Counters held in this process; each worker counts on its own."""
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(windows) for windows in self._tables.values())
+
+    def hit(self, scope, key, bucket, limit, buckets):
+        with self._lock:
+            windows = self._tables.get(scope)
+            if windows is None:
+                windows = self._tables[scope] = OrderedDict()
+            state = windows.get(key)
+            if state is None:
+                self._evict(windows, bucket, buckets)
+                state = windows[key] = _Window(bucket)
+            else:
+                windows.move_to_end(key)
+                state.advance(bucket, buckets)
+            if state.total >= limit:
+                return False
+            state.add(buckets)
+            return True
+
+    def undo(self, scope, key, bucket, buckets):
+        with self._lock:
+            state = self._tables.get(scope, {}).get(key)
+            if state is not None:
+                state.remove(bucket, buckets)
+
+    def _evict(self, windows, bucket, buckets):
+        while len(windows) >= self.max_keys:
+            windows.popitem(last=False)
+        # The least recently used keys come first; drop those whose every
+        # bucket has expired. This stops at the first key still in use.
+        while windows:
+            key, oldest = next(iter(windows.items()))
+            if bucket - oldest.bucket < buckets:
+                break
+            del windows[key]
+
+    def reset(self, scope, key=None):
+        with self._lock:
+            if key is None:
+                self._tables.pop(scope, None)
+            elif scope in self._tables:
+                self._tables[scope].pop(key, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Counters in a SQLite database shared by every worker process.
+
+    Each process opens one connection and one lock file and uses them under
+    a lock: every write queues on the file lock anyway, so a connection per
+    thread would only add open files, and a server that starts a thread per
+    request would open one for each request. A process forked after the
+    backend was created opens its own rather than sharing its parent's. The
+    table has one row per key and live bucket, so its size is bounded by the
+    number of keys seen in the last window.
+    """
+
+    def __init__(self, path, busy_timeout=db.DEFAULT_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        # The parent's connection and lock file, kept open in a forked child:
+        # closing the child's copies could disturb the parent's locks.
+        self._inherited = []
+        self._conn = None
+        self._open()
+        if hasattr(os, 'register_at_fork'):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._after_fork())
+        with self._writing() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS rate_limit_hits (
+                                scope TEXT NOT NULL, key TEXT NOT NULL, bucket INTEGER NOT NULL, hits INTEGER NOT NULL,
+                                PRIMARY KEY (scope, key, bucket)) WITHOUT ROWID''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_bucket ON rate_limit_hits (scope, bucket)')
+            conn.commit()
+
+    def _open(self):
+        self._lock = threading.Lock()
+        self._conn = db.connect(self.path, self.busy_timeout)
+        # Losing the last few hits in a power cut is harmless here.
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._lock_fd = None
+        if fcntl is not None:
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        self._purged = {}
+
+    def _after_fork(self):
+        if self._conn is not None:
+            self._inherited.append((self._conn, self._lock_fd))
+            self._open()
+
+    @contextlib.contextmanager
+    def _writing(self):
+        # Writers queue on a kernel file lock first: SQLite's busy handler
+        # polls with sleeps of up to 100ms, which under contention turns a
+        # 30us hit into a multi-millisecond one.
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError('rate limit backend is closed')
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                raise
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def hit(self, scope, key, bucket, limit, buckets):
+        oldest = bucket - buckets
+        with self._writing() as conn:
+            # IMMEDIATE takes the write lock before reading, so two workers
+            # cannot both see the last free slot.
+            conn.execute('BEGIN IMMEDIATE')
+            if self._purged.get(scope) != bucket:
+                conn.execute('DELETE FROM rate_limit_hits WHERE scope = ? AND bucket <= ?', (scope, oldest))
+                self._purged[scope] = bucket
+            total, = conn.execute('SELECT COALESCE(SUM(hits), 0) FROM rate_limit_hits '
+                                  'WHERE scope = ? AND key = ? AND bucket > ?', (scope, key, oldest)).fetchone()
+            allowed = total < limit
+            if allowed:
+                conn.execute('''INSERT INTO rate_limit_hits (scope, key, bucket, hits) VALUES (?, ?, ?, 1)
+                                ON CONFLICT (scope, key, bucket) DO UPDATE SET hits = hits + 1''',
+                             (scope, key, bucket))
+            conn.commit()
+        return allowed
+
+    def undo(self, scope, key, bucket, buckets):
+        with self._writing() as conn:
+            # A bucket that has left the window was purged or soon will be;
+            # there is nothing left to take back.
+            conn.execute('UPDATE rate_limit_hits SET hits = hits - 1 '
+                         'WHERE scope = ? AND key = ? AND bucket = ? AND hits > 0', (scope, key, bucket))
+            conn.commit()
+
+    def reset(self, scope, key=None):
+        with self._writing() as conn:
+            if key is None:
+                conn.execute('DELETE FROM rate_limit_hits WHERE scope = ?', (scope,))
+            else:
+                conn.execute('DELETE FROM rate_limit_hits WHERE scope = ? AND key = ?', (scope, key))
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            self._conn = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+
+def _create_backend(app):
+    path = app.config.setdefault('RATE_LIMIT_DATABASE', '')
+    if path:
+        return SQLiteBackend(path, app.config.get('DB_BUSY_TIMEOUT', db.DEFAULT_BUSY_TIMEOUT))
+    return MemoryBackend()
+
+
+def get_backend(app=None):
+    """Return the app's backend, (re)creating it if the configuration changed."""
+    app = app or current_app
+    backend = app.extensions.get('rate_limit')
+    path = app.config.get('RATE_LIMIT_DATABASE', '')
+    if backend is None or getattr(backend, 'path', '') != path:
+        if backend is not None:
+            backend.close()
+        backend = app.extensions['rate_limit'] = _create_backend(app)
+    return backend
+
+
+class RateLimiter:
+    """Allow at most ``limit`` hits per key in any ``window`` seconds.
+
+    ``scope`` names the limiter in the shared backend. Without an explicit
+    ``backend`` the current app's one is used. The clock is wall time so that
+    separate processes agree on bucket boundaries.
+    """
+
+    def __init__(self, scope, limit, window, buckets=DEFAULT_BUCKETS, backend=None, clock=time.time):
+        if not 0 < limit <= COUNTER_MASK:
+            raise ValueError(f'limit must be between 1 and {COUNTER_MASK}')
+        self.scope = scope
+        self.max_hits = limit
+        self.window = window
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.backend = backend
+        self.clock = clock
+
+    def _backend(self):
+        return self.backend if self.backend is not None else get_backend()
+
+    def _bucket(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def hit(self, key):
+        """Count one hit for key; return False if it is over the limit."""
+        return self._backend().hit(self.scope, key, self._bucket(), self.max_hits, self.buckets)
+
+    def reserve(self, key):
+        """Count one hit for key like hit(), returning a token for undo().
+
+        Returns None, and counts nothing, if key is over the limit.
+        """
+        bucket = self._bucket()
+        if self._backend().hit(self.scope, key, bucket, self.max_hits, self.buckets):
+            return bucket
+        return None
+
+    def undo(self, key, token):
+        """Take back the hit that reserve() returned token for."""
+        self._backend().undo(self.scope, key, token, self.buckets)
+
+    def reset(self, key=None):
+        self._backend().reset(self.scope, key)
+
+    def limited_response(self, message=DEFAULT_MESSAGE, on_limit=None):
+        """The 429 response for a request over the limit."""
+        response = make_response(on_limit(message) if on_limit else message, 429)
+        response.headers['Retry-After'] = str(int(self.bucket_seconds) or 1)
+        return response
+
+    def limit(self, methods=('POST',), key=lambda: request.remote_addr, message=DEFAULT_MESSAGE, on_limit=None):
+        """Decorate a view so requests over the limit get a 429 response.
+
+        Only requests whose method is in ``methods`` are counted. ``on_limit``
+        builds the response body from ``message``; by default it is the
+        message as plain text.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method in methods and not self.hit(key()):
+                    return self.limited_response(message, on_limit)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
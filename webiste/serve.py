@@ -0,0 +1,186 @@
+"""Run the demo app with pre-forked worker processes.
+
+``python3 app.py`` runs Flask's debug server. That is one process whose
+reloader starts the app twice, and it runs the debugger on every request.
+Anything beyond a handful of concurrent clients swamps it. This script is
+the production launch mode:
+
+* ``create_app()`` sets up the database once, in the parent, and the
+  listening socket is opened there too,
+* ``--workers`` processes are forked from the parent. Each one accepts
+  connections from the shared socket and handles them on a pool of
+  ``--threads`` threads. A worker with every thread busy stops accepting, so
+  new connections go to a worker that has a free thread,
+* a worker that dies is replaced, and SIGINT or SIGTERM stops them all.
+
+Everything in the app that is kept per process (the database pool, the ping
+and password pools, the crash sandbox, the in-memory rate limit counts) is
+created lazily, so each worker gets its own. Set RATE_LIMIT_DATABASE to share
+the rate limit counts between workers.
+
+Usage (from the webiste directory):
+    python3 serve.py                          # one worker per CPU, 8 threads each
+    python3 serve.py --workers 4 --threads 16 --port 8000
+    python3 serve.py --debug                  # the same as python3 app.py
+
+The same factory works with gunicorn, if it is installed:
+    gunicorn --preload -w 4 --threads 8 'app:create_app()'
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, get_sockaddr, select_address_family
+
+from app import create_app
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_THREADS = 8
+# Seconds an idle keep-alive connection may hold a thread.
+KEEPALIVE_TIMEOUT = 5
+LISTEN_QUEUE = 1024
+# A worker that dies sooner than this after starting is restarted only after
+# the same delay, so a worker that cannot start does not fork in a loop.
+MIN_WORKER_LIFETIME = 1.0
+
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    access_log = False
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """A werkzeug server that handles connections on a fixed pool of threads."""
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads, fd, handler=RequestHandler):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        self._free = threading.BoundedSemaphore(threads)
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop until a thread is free, leaving the next
+        # connection in the listen queue for another worker.
+        self._free.acquire()
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._free.release()
+
+
+def listen(host, port):
+    family = select_address_family(host, port)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(get_sockaddr(host, port, family))
+    sock.listen(LISTEN_QUEUE)
+    # Every worker is woken for each new connection but only one gets it; the
+    # others must not block in accept().
+    sock.setblocking(False)
+    return sock
+
+
+def _stop(signum, frame):
+    raise SystemExit(0)
+
+
+def _worker(app, sock, host, threads):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _stop)
+    server = PooledWSGIServer(host, sock.getsockname()[1], app, threads, sock.fileno())
+    server.serve_forever()
+
+
+def run(app, host='127.0.0.1', port=5000, workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS):
+    """Serve app from ``workers`` forked processes until SIGINT or SIGTERM."""
+    sock = listen(host, port)
+    print(f' * Serving on http://{host}:{sock.getsockname()[1]} with {workers} workers x {threads} threads',
+          file=sys.stderr, flush=True)
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                _worker(app, sock, host, threads)
+                status = 0
+            except SystemExit:
+                status = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                # os._exit skips atexit, so drain the error log here.
+                logging.shutdown()
+                sys.stderr.flush()
+                os._exit(status)
+        children[pid] = time.monotonic()
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        for _ in range(workers):
+            spawn()
+        while True:
+            pid, status = os.wait()
+            started = children.pop(pid, None)
+            if started is None:
+                continue
+            print(f' * Worker {pid} exited with status {status}, restarting', file=sys.stderr, flush=True)
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='worker processes')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='request threads per worker')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stderr')
+    parser.add_argument('--debug', action='store_true', help="Flask's debug server, as python3 app.py runs")
+    args = parser.parse_args()
+
+    if args.debug:
+        create_app().run(host=args.host, port=args.port, debug=True)
+        return
+    RequestHandler.access_log = args.access_log
+    run(create_app(), args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Streaming receipt and content-addressed storage of uploaded files.
+
+``file.save()`` on ``request.files`` meant werkzeug first spooled the whole
+part to a temporary file of its own, the view then copied it into uploads/,
+and nothing limited the size. ``receive()`` instead parses the request body
+with a stream factory that writes each file part straight into an
+``IncomingFile``: a temporary file in the upload folder that counts and
+SHA-256 hashes the bytes as they arrive. The body is read in fixed-size
+chunks, so memory per upload does not depend on its size, and the upload is
+aborted with a 413 as soon as a part goes over the limit (or before reading
+anything when Content-Length is already too large).
+
+Finished files go into a ``BlobStore``: each distinct content is stored
+once, under its SHA-256 in a sharded layout (``ab/cd/abcd...``), and the
+``uploads`` table in users.db maps each uploaded file name to a hash. An
+upload whose content is already stored only adds an index row; its temporary
+file is deleted before it is ever fsynced, so disk space and writes grow with
+the amount of distinct content rather than the number of uploads. A new blob
+is fsynced and renamed into place, so a blob is always complete.
+
+Blobs are never deleted, even when no name points to them any more.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from flask import current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+TEMP_PREFIX = '.upload-'
+DEFAULT_MAX_BYTES = 1024 * 1024
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD = 16 * 1024
+# Caps text fields, and werkzeug also applies it to its parse buffer, which
+# can hold more than one read chunk; this is Flask's own default.
+MAX_FORM_MEMORY = 500 * 1024
+CHUNK_SIZE = 64 * 1024
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class IncomingFile:
+    """A temporary file that hashes and counts what is written to it."""
+
+    def __init__(self, directory, max_bytes):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # werkzeug rewinds each part when it ends; nothing reads it back.
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def commit(self, dest):
+        """Flush the file to disk and atomically move it to dest."""
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.path, dest)
+            self.path = None
+        except BaseException:
+            self.discard()
+            raise
+
+    def discard(self):
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    close = discard
+
+
+def receive(environ, directory, max_bytes=DEFAULT_MAX_BYTES):
+    """Parse a multipart request body, streaming file parts into ``directory``.
+
+    Returns ``(form, files)`` as werkzeug MultiDicts; each file's ``stream``
+    is an IncomingFile that the caller commits or discards. Raises
+    RequestEntityTooLarge, with every partial file removed, when the body or a
+    file is over the limit.
+    """
+    incoming = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        file = IncomingFile(directory, max_bytes)
+        incoming.append(file)
+        return file
+
+    try:
+        _, form, files = parse_form_data(environ, stream_factory=stream_factory,
+                                         max_form_memory_size=MAX_FORM_MEMORY,
+                                         max_content_length=max_bytes + MULTIPART_OVERHEAD)
+    except BaseException:
+        for file in incoming:
+            file.discard()
+        raise
+    return form, files
+
+
+class BlobStore:
+    """Files stored once per distinct content, named by their SHA-256."""
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def add(self, incoming):
+        """Store an IncomingFile and return True if its content was new."""
+        dest = self.path(incoming.sha256)
+        if os.path.exists(dest):
+            incoming.discard()
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # Two uploads of the same new content may both get here; the second
+        # rename replaces the first blob with identical bytes.
+        incoming.commit(dest)
+        return True
+
+    def add_file(self, path):
+        """Store an existing file, hard-linking it when possible; return its hash."""
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        dest = self.path(digest)
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            try:
+                os.link(path, dest)
+            except OSError:
+                shutil.copyfile(path, dest)
+        return digest
+
+
+def record(conn, name, sha256, size):
+    """Point name at a blob, replacing any earlier upload of the same name."""
+    conn.execute('''INSERT INTO uploads (name, sha256, size, uploaded_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET sha256 = excluded.sha256, size = excluded.size,
+                                                     uploaded_at = excluded.uploaded_at''',
+                 (name, sha256, size, datetime.now().strftime(TIME_FORMAT)))
+    conn.commit()
+
+
+def lookup(conn, name):
+    """Return (sha256, size, uploaded_at) for an uploaded name, or None."""
+    return conn.execute('SELECT sha256, size, uploaded_at FROM uploads WHERE name = ?', (name,)).fetchone()
+
+
+def uploaded_time(uploaded_at):
+    """The index stores local time; return it as an aware UTC datetime."""
+    return datetime.strptime(uploaded_at, TIME_FORMAT).astimezone(timezone.utc)
+
+
+def list_page(conn, after, per_page):
+    """Return up to per_page (name, size, uploaded_at) rows after name ``after``
+    and the cursor for the next page (None on the last page).
+
+    Keyset pagination on the primary key, so a page costs the same however
+    many files there are.
+    """
+    rows = conn.execute('SELECT name, size, uploaded_at FROM uploads WHERE name > ? ORDER BY name LIMIT ?',
+                        (after, per_page + 1)).fetchall()
+    next_cursor = rows[per_page - 1][0] if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def import_folder(conn, folder, store):
+    """Index the plain files in folder that predate the store.
+
+    The files themselves are left where they are; their blobs are hard links
+    to them (or copies on filesystems without links).
+    """
+    indexed = {row[0] for row in conn.execute('SELECT name FROM uploads')}
+    for entry in os.scandir(folder):
+        if entry.name in indexed or entry.name.startswith(TEMP_PREFIX) or not entry.is_file(follow_symlinks=False):
+            continue
+        digest = store.add_file(entry.path)
+        record(conn, entry.name, digest, entry.stat().st_size)
+
+
+def get_store(app=None):
+    """Return the app's blob store, (re)creating it if UPLOAD_STORE changed."""
+    app = app or current_app
+    store = app.extensions.get('upload_store')
+    if store is None or store.root != app.config['UPLOAD_STORE']:
+        store = app.extensions['upload_store'] = BlobStore(app.config['UPLOAD_STORE'])
+    return store